@@ -1,181 +1,441 @@
-from joystick_manager import JoystickManager
-import vgamepad as vg
-import keyboard
 import time
-import sys
+STARTED = time.perf_counter()  # before the imports below, for the startup breakdown
+from joystick_manager import JoystickManager
+from xusb_report import XusbReport
+from profiler import StartupTimer, TickProfiler
+from bindings import DISABLEABLE_AXES
+from rudder import LEFT_SHOULDER, RIGHT_SHOULDER
+from config_watch import ConfigWatcher
+from backends import FakeGamepad, create_gamepad
+from recording import RecordingInput, ReplayInput
+from threaded import run_threaded
+from terminal import TerminalRenderer
 import atexit
+import argparse
+
+# how long an event-mode wait may block before re-checking the kill switches
+EVENT_WAIT_TIMEOUT = 0.25
+# while a One Euro filter is still easing towards a held stick, wake about as often as --mode fixed would
+FILTER_SETTLE_TIMEOUT = 1.0 / 250
+
+THROTTLE_DISABLED = DISABLEABLE_AXES['throttle']
 
 class AceCombatController:
-    def __init__(self):
-        self.manager = JoystickManager()
+    def __init__(self, use_numpy: bool = False, device=None, gamepad=None, hook_keyboard: bool = True,
+                 startup=None, config_path: str = 'config.json', wrap_device=None):
+        # device/gamepad default to the real stick and ViGEm pad, see backends.py for fakes
+        self.manager = JoystickManager(use_numpy, device, startup, config_path, wrap_device)
         self.running = True
-        self.gamepad = vg.VX360Gamepad()
+        self.gamepad = gamepad if gamepad is not None else create_gamepad()
+        self.report = XusbReport()
+        if startup is not None:
+            startup.mark('pad')
         
-        # kill switch key if configured
-        self.kill_key = self.manager.config.get('kill_switch', {}).get('key')
-        if self.kill_key:
-            keyboard.on_press_key(self.kill_key, self.handle_kill_switch)
+        # kill switch and profile keys if configured, keyboard is only imported (and hooks installed) then
+        self.kill_key = self.manager.config.get('kill_switch', {}).get('key') if hook_keyboard else None
+        profiles = self.manager.mapping.profiles
+        self.profile_keys = profiles.keys if hook_keyboard and profiles is not None else {}
+        if self.kill_key or self.profile_keys:
+            import keyboard
+            if self.kill_key:
+                keyboard.on_press_key(self.kill_key, self.handle_kill_switch)
+            for key, target in self.profile_keys.items():
+                # targets are names, looked up in whatever profile set is current when pressed
+                keyboard.on_press_key(key, lambda _, target=target: self.request_profile(target))
+            if startup is not None:
+                startup.mark('keyboard')
         
-        # get bindings
-        self.bindings = self.manager.config.get('bindings', {})
-        self.controls = self.manager.config.get('controls', {})
-        self.disabled_axes = set()
-        self.active_combos = set()
-        self.debug = False  # run python ace_combat.py --debug
+        self.pending_profile = None  # switch requested by a key, applied on the next tick
+        self.display = None  # TerminalRenderer when running with --debug
+        self.profiler = None  # TickProfiler when running with --profile
+        self.config_watcher = None  # ConfigWatcher unless running with --no-reload
+        self.telemetry = None  # TelemetryWriter unless running with --no-telemetry
+        self.apply_mapping(self.manager.mapping)
+    
+    def apply_mapping(self, mapping):
+        """Switches to a compiled mapping. Only called between ticks."""
+        self.manager.install(mapping)
+        self.bindings = mapping.resolved.get('bindings', {})
+        self.controls = mapping.resolved.get('controls', {})
+        self.binding_table = mapping.bindings
+        self.kill_button = mapping.kill_button
+        self.rudder_threshold = mapping.rudder_threshold
+        self.rudder_pwm = mapping.rudder
+        self.filters = mapping.pipeline.filters
+        self.profiles = mapping.profiles
+        self.profile_index = mapping.profiles.index[mapping.name] if mapping.profiles is not None else 0
+        if self.profiler is not None:
+            mapping.pipeline.attach_profiler(self.profiler)
+        if self.telemetry is not None:
+            self.describe_telemetry()
+        
+        # output slots resolved once, unmapped controls read the plan's zero slot
+        plan = mapping.plan
+        self.roll_slot = plan.slot('roll')
+        self.pitch_slot = plan.slot('pitch')
+        self.yaw_slot = plan.slot('yaw')
+        self.throttle_slot = plan.slot('throttle')
+        self.hat_x_slot = plan.slot('hat_x')
+        self.hat_y_slot = plan.slot('hat_y')
+
+    def enable_telemetry(self, writer):
+        self.telemetry = writer
+        self.describe_telemetry()
+
+    def describe_telemetry(self):
+        mapping = self.manager.mapping
+        self.telemetry.describe(mapping.plan.output_names, self.binding_table.combo_names,
+                                len(mapping.pipeline.values))
+
+    def watch_config(self, path: str = None):
+        self.config_watcher = ConfigWatcher(path or self.manager.config_path, self.manager.build)
+
+    def check_config_reload(self, snapshot):
+        mapping = self.config_watcher.poll(time.perf_counter())
+        if mapping is not None:
+            # stay on the same profile if the new config still has it
+            profiles = mapping.profiles
+            current = self.manager.mapping.name
+            buttons = snapshot.buttons
+            if profiles is not None:
+                if current in profiles.index:
+                    mapping = profiles.mappings[profiles.index[current]]
+                # a chord held across the reload neither switches again nor reaches the bindings
+                profiles.resume(buttons, self.profiles.held if self.profiles is not None else 0)
+                buttons &= ~profiles.suppressed
+            # buttons already down aren't new presses for the fresh combo state
+            mapping.resume(buttons)
+            self.apply_mapping(mapping)
+            print("\nConfig reloaded")
+
+    def request_profile(self, target):
+        # keyboard thread, the switch itself happens between ticks
+        self.pending_profile = target
+        self.manager.wake()
+
+    def check_profile_switch(self, snapshot):
+        profiles = self.profiles
+        target = profiles.poll(snapshot.buttons)
+        if target is None:
+            target = self.pending_profile
+            if target is None:
+                return
+            self.pending_profile = None
+        index = profiles.target(target, self.profile_index)
+        if index is None or index == self.profile_index:
+            # a key for a profile the reloaded config no longer has
+            return
+        # precompiled: a few attribute swaps, the report (and so the pad) carries over as is
+        mapping = profiles.mappings[index]
+        mapping.resume(snapshot.buttons & ~profiles.suppressed)
+        self.apply_mapping(mapping)
+        print(f"\nProfile: {mapping.name}")
     
     def handle_kill_switch(self, _):
         print("\nKill switch activated, exiting...")
+        self.stop()
+
+    def stop(self):
         self.running = False
+        self.manager.wake()  # don't sit in an event wait until the timeout
     
-    def process_axis(self, inputs):
-        if self.debug:
-            print("\rControls:", end=' ')
-            print(f"Roll: {inputs.get('roll', 0):>5.2f}", end=' ')
-            print(f"Pitch: {inputs.get('pitch', 0):>5.2f}", end=' ')
-            print(f"Yaw: {inputs.get('yaw', 0):>5.2f}", end=' ')
-            print(f"Throttle: {inputs.get('throttle', 0):>5.2f}", end=' ')
-            print(f"Camera: {inputs.get('hat_x', 0):>4.1f}/{inputs.get('hat_y', 0):<4.1f}", end='')
+    def process_axis(self, inputs, now: float = 0.0):
+        roll = inputs[self.roll_slot]
+        pitch = inputs[self.pitch_slot]
+        rudder = inputs[self.yaw_slot]
+        hat_x = inputs[self.hat_x_slot]
+        hat_y = inputs[self.hat_y_slot]
+
+        report = self.report
+        table = self.binding_table
 
         # basic
-        self.gamepad.left_joystick_float(
-            inputs.get('roll', 0), 
-            -inputs.get('pitch', 0)
-        )
+        report.set_left_stick(roll, -pitch)
         
         # hat for camera
-        self.gamepad.right_joystick_float(
-            inputs.get('hat_x', 0),
-            inputs.get('hat_y', 0)
-        )
+        report.set_right_stick(hat_x, hat_y)
         
         # rudder (funny story actually, this took me forever because I totally forgot the rudder is BINARY in this STUPID game)
-        rudder = inputs.get('yaw', 0)
-        if abs(rudder) > 0.3:
-            if rudder > 0:
-                self.gamepad.press_button(vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER)
-            else:
-                self.gamepad.press_button(vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER)
-            self.gamepad.update()
-        else:
-            self.gamepad.release_button(vg.XUSB_BUTTON.XUSB_GAMEPAD_LEFT_SHOULDER)
-            self.gamepad.release_button(vg.XUSB_BUTTON.XUSB_GAMEPAD_RIGHT_SHOULDER)
-            self.gamepad.update()
+        if self.rudder_pwm is not None:
+            # proportional, pulses the shoulder button for a share of every period
+            report.buttons |= self.rudder_pwm.update(rudder, now)
+        elif abs(rudder) > self.rudder_threshold:
+            report.buttons |= RIGHT_SHOULDER if rudder > 0 else LEFT_SHOULDER
 
         # FIXED throttle
-        if 'throttle' not in self.disabled_axes:
-            throttle = inputs.get('throttle', 0)
+        if not table.disabled & THROTTLE_DISABLED:
+            throttle = inputs[self.throttle_slot]
             if throttle < 0:
-                self.gamepad.right_trigger_float(-throttle)
-                self.gamepad.left_trigger_float(0)
+                report.set_triggers(0, -throttle)
             elif throttle > 0:
-                self.gamepad.left_trigger_float(throttle)
-                self.gamepad.right_trigger_float(0)
+                report.set_triggers(throttle, 0)
             else:
-                self.gamepad.right_trigger_float(0)
-                self.gamepad.left_trigger_float(0)
+                report.set_triggers(0, 0)
 
-        self.process_buttons()
-        self.gamepad.update()
+        # both triggers for high-g turn
+        analog = table.analog_override()
+        if analog is not None:
+            report.set_triggers(*analog)
 
-    def process_buttons(self):
-        standard_buttons = self.bindings.get('standard', {})
-        combos = self.bindings.get('combos', {})
-
-        # XUSB button value map
-        XUSB_MAP = {
-            'XUSB_GAMEPAD_A': 0x1000,
-            'XUSB_GAMEPAD_B': 0x2000,
-            'XUSB_GAMEPAD_X': 0x4000,
-            'XUSB_GAMEPAD_Y': 0x8000,
-            'XUSB_GAMEPAD_START': 0x0010,
-            'XUSB_GAMEPAD_BACK': 0x0020,
-            'XUSB_GAMEPAD_LEFT_THUMB': 0x0040,
-            'XUSB_GAMEPAD_RIGHT_THUMB': 0x0080,
-            'XUSB_GAMEPAD_LEFT_SHOULDER': 0x0100,
-            'XUSB_GAMEPAD_RIGHT_SHOULDER': 0x0200,
-        }
-
-        # standard buttons
-        for action, binding in standard_buttons.items():
-            try:
-                xusb_name = binding.get('xusb')
-                button_id = binding.get('button')
-                if button_id is not None and xusb_name in XUSB_MAP:
-                    if self.manager.is_button_pressed(button_id):
-                        self.gamepad.press_button(XUSB_MAP[xusb_name])
-                    else:
-                        self.gamepad.release_button(XUSB_MAP[xusb_name])
-            except Exception as e:
-                print(f"Warning: Invalid button mapping for {action}: {e}")
-        
-        # combos 
-        for combo_name, combo in combos.items():
-            try:
-                trigger = combo.get('trigger')
-                if trigger is not None and self.manager.is_button_pressed(trigger):
-                    self.active_combos.add(combo_name)
-                    self.disabled_axes.update(combo.get('disable_axes', []))
-                    
-                    for xusb_name in combo.get('xusb', []):
-                        if xusb_name in XUSB_MAP:
-                            self.gamepad.press_button(XUSB_MAP[xusb_name])
-                    
-                    if combo.get('analog'):
-                        # both triggers for high-g turn
-                        self.gamepad.left_trigger_float(1.0)
-                        self.gamepad.right_trigger_float(1.0)
-                else:
-                    for xusb_name in combo.get('xusb', []):
-                        if xusb_name in XUSB_MAP:
-                            self.gamepad.release_button(XUSB_MAP[xusb_name])
-                    self.active_combos.discard(combo_name)
-                    for axis in combo.get('disable_axes', []):
-                        self.disabled_axes.discard(axis)
-            except Exception as e:
-                print(f"Warning: Invalid combo mapping for {combo_name}: {e}")
+    def process_buttons(self, snapshot):
+        # standard buttons and combo presses in one go, the button word is rebuilt every tick
+        buttons = snapshot.buttons
+        profiles = self.profiles
+        if profiles is not None and profiles.suppressed:
+            # a held switch chord isn't also a button press
+            buttons &= ~profiles.suppressed
+        self.report.buttons = self.binding_table.evaluate(buttons, snapshot.timestamp)
+
+    def debug_lines(self):
+        # runs on the display thread, plan and buffer come from one mapping so a reload can't mix them
+        mapping = self.manager.mapping
+        inputs = mapping.pipeline.values
+        slot = mapping.plan.slot
+        report = self.report
+        return [
+            f"Controls: Roll: {inputs[slot('roll')]:>5.2f} Pitch: {inputs[slot('pitch')]:>5.2f} "
+            f"Yaw: {inputs[slot('yaw')]:>5.2f} Throttle: {inputs[slot('throttle')]:>5.2f} "
+            f"Camera: {inputs[slot('hat_x')]:>4.1f}/{inputs[slot('hat_y')]:<4.1f}",
+            f"Pad: buttons {report.buttons:#06x} triggers {report.left_trigger:>3}/{report.right_trigger:<3} "
+            f"combos: {', '.join(sorted(self.active_combos)) or 'none'}",
+        ]
+
+    def show_debug(self):
+        self.display = TerminalRenderer(self.debug_lines)
+        self.display.start()
+
+    def wait_timeout(self, limit: float) -> float:
+        """How long an idle loop may block without missing a combo timer, rudder pulse edge or filter step."""
+        if self.filters is not None and not self.filters.settled:
+            limit = min(limit, FILTER_SETTLE_TIMEOUT)
+        deadline = self.binding_table.next_deadline
+        if self.rudder_pwm is not None and self.rudder_pwm.next_edge is not None:
+            edge = self.rudder_pwm.next_edge
+            deadline = edge if deadline is None or edge < deadline else deadline
+        if deadline is None:
+            return limit
+        return min(limit, max(0.0, deadline - time.perf_counter()))
+
+    @property
+    def active_combos(self):
+        return set(self.binding_table.active_names())
+
+    def tick(self) -> bool:
+        """One read -> map -> submit pass. Returns False once the loop should stop."""
+        return self.process_snapshot(self.manager.capture())
+
+    def process_snapshot(self, snapshot) -> bool:
+        """Map -> submit for an already captured snapshot."""
+        if self.config_watcher is not None:
+            self.check_config_reload(snapshot)
+        if self.profiles is not None:
+            self.check_profile_switch(snapshot)
+        # buttons and combos first so a combo takes over its axes on the same tick
+        self.process_buttons(snapshot)
+        values = self.manager.process(snapshot)
+        self.process_axis(values, snapshot.timestamp)
+        # single driver call per tick, skipped entirely when nothing changed
+        self.report.submit(self.gamepad)
+        if self.telemetry is not None:
+            self.telemetry.publish(snapshot, values, self.binding_table.active, self.report)
+        return self.check_kill_button(snapshot)
+
+    def tick_profiled(self) -> bool:
+        # same as tick() with a timestamp after every stage
+        clock = time.perf_counter_ns
+        start = clock()
+        snapshot = self.manager.capture()
+        return self.process_snapshot_profiled(snapshot, start, clock())
+
+    def process_snapshot_profiled(self, snapshot, start: int = None, read: int = None) -> bool:
+        clock = time.perf_counter_ns
+        if start is None:
+            # read on another thread (--threaded), "read" becomes sample -> pickup delay
+            start, read = int(snapshot.timestamp * 1e9), clock()
+        if self.config_watcher is not None:
+            self.check_config_reload(snapshot)
+        if self.profiles is not None:
+            self.check_profile_switch(snapshot)
+        self.process_buttons(snapshot)
+        buttons = clock()
+        values = self.manager.process(snapshot)
+        self.process_axis(values, snapshot.timestamp)
+        axes = clock()
+        self.report.submit(self.gamepad)
+        if self.telemetry is not None:
+            # counted in the submit stage
+            self.telemetry.publish(snapshot, values, self.binding_table.active, self.report)
+        submit = clock()
+        self.profiler.record_tick(start, read, buttons, axes, submit)
+        return self.check_kill_button(snapshot)
+
+    def enable_profiling(self, profiler):
+        # swaps the tick implementation so the unprofiled path pays nothing
+        self.profiler = profiler
+        self.manager.pipeline.attach_profiler(profiler)
+        self.tick = self.tick_profiled
+        self.process_snapshot = self.process_snapshot_profiled
+
+    def check_kill_button(self, snapshot) -> bool:
+        if snapshot.pressed(self.kill_button):
+            print("\nJoystick kill switch activated, exiting...")
+            self.stop()
+        return self.running
 
     def cleanup(self):
-        if self.kill_key:
+        if self.display is not None:
+            self.display.stop()
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
+        if self.kill_key or self.profile_keys:
+            import keyboard
             keyboard.unhook_all()
         # reset v controller
         self.gamepad.reset()
         self.gamepad.update()
+        self.report.reset()
+
+def run_poll(controller, interval: float):
+    # legacy behaviour, fixed sleep after every tick
+    while controller.tick():
+        time.sleep(interval)
+
+def run_event_driven(controller):
+    # wake as soon as the stick reports a change, sleep otherwise
+    controller.manager.enable_input_events()
+    while controller.tick():
+        controller.manager.wait_for_input(controller.wait_timeout(EVENT_WAIT_TIMEOUT))
+
+def run_fixed_rate(controller, rate: float):
+    # absolute deadlines so sleep overshoot doesn't accumulate into drift
+    period = 1.0 / rate
+    deadline = time.perf_counter()
+    while controller.tick():
+        deadline += period
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            time.sleep(remaining)
+            continue
+        if controller.profiler is not None:
+            controller.profiler.record_missed_deadline()
+        if remaining < -period:
+            # fell more than a whole tick behind, resync instead of bursting to catch up
+            deadline = time.perf_counter()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ace Combat 7 flight stick mapper")
+    parser.add_argument('--debug', action='store_true', help="show control values")
+    parser.add_argument('--mode', choices=['event', 'fixed', 'poll'], default='event',
+                        help="event: wake on joystick input (lowest latency), "
+                             "fixed: steady --rate output, poll: legacy 10 ms sleep")
+    parser.add_argument('--rate', type=float, default=250.0,
+                        help="ticks per second for --mode fixed")
+    parser.add_argument('--threaded', action='store_true',
+                        help="sample the device on its own thread and map/submit on another, "
+                             "so slow output never delays a read")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every loop stage and print latency percentiles on exit")
+    parser.add_argument('--profile-json', metavar='FILE',
+                        help="also write the profile summary to FILE (implies --profile)")
+    parser.add_argument('--no-telemetry', action='store_true',
+                        help="don't publish per-tick state to shared memory for test_inputs.py and other tools")
+    parser.add_argument('--numpy', action='store_true',
+                        help="use the vectorized numpy axis path (slower below ~70 mapped axes)")
+    parser.add_argument('--no-reload', action='store_true',
+                        help="don't watch config.json for changes")
+    parser.add_argument('--record', metavar='FILE',
+                        help="record every raw device sample to FILE")
+    parser.add_argument('--replay', metavar='FILE',
+                        help="read input from a recording instead of the joystick")
+    parser.add_argument('--replay-fast', action='store_true',
+                        help="replay as fast as possible instead of in real time")
+    parser.add_argument('--fake-pad', action='store_true',
+                        help="send output to an in-memory pad instead of ViGEm (for replays/testing)")
+    return parser.parse_args(argv)
 
 def main():
+    startup = StartupTimer(STARTED)
+    startup.mark('imports')
+    args = parse_args()
+    controller = None
+    device = None
     try:
-        controller = AceCombatController()
-        kill_button = controller.manager.config.get('kill_switch', {}).get('button')
+        if args.replay:
+            replay = device = ReplayInput(args.replay, realtime=not args.replay_fast)
+            startup.mark('input')
+        # wrapped after the manager opens the stick(s), so a devices layout is recorded merged
+        record = (lambda source: RecordingInput(source, args.record)) if args.record else None
+        gamepad = FakeGamepad() if args.fake_pad else None
+        controller = AceCombatController(args.numpy, device=device, gamepad=gamepad, startup=startup,
+                                         wrap_device=record)
+        if args.debug:
+            controller.show_debug()
+        if args.replay:
+            replay.on_end = controller.stop
+            print(f"Replaying {len(replay.recording)} samples from {args.replay}")
+        kill_button = controller.kill_button
         
         print("Virtual Xbox controller initialized for Ace Combat 7")
         if kill_button is not None:
             print(f"Joystick kill switch: Button {kill_button}")
         if controller.kill_key is not None:
             print(f"Keyboard kill switch: '{controller.kill_key}' key")
+        if controller.profiles is not None:
+            print(f"Profiles: {', '.join(controller.profiles.names)} (active: {controller.manager.mapping.name})")
         if kill_button is None and controller.kill_key is None:
             print("No kill switches configured. Use Ctrl+C to exit.")
         
         print("Use --debug flag to show control values")
-        if len(sys.argv) > 1 and sys.argv[1] == '--debug':
-            controller.debug = True
+        if not args.no_reload:
+            controller.watch_config()
+        if args.profile or args.profile_json:
+            controller.enable_profiling(TickProfiler())
+        if not args.no_telemetry:
+            # multiprocessing is slow to import, only paid for when publishing
+            from telemetry import TelemetryWriter
+            source = controller.manager.device
+            controller.enable_telemetry(TelemetryWriter(source.num_axes, source.num_buttons, source.num_hats))
+            startup.mark('telemetry')
         
         # cleanup
         atexit.register(controller.cleanup)
         
-        while controller.running:
-            inputs = controller.manager.get_processed_input()
-            controller.process_axis(inputs)
-            
-            # kill switch check
-            if kill_button is not None and controller.manager.is_button_pressed(kill_button):
-                print("\nJoystick kill switch activated, exiting...")
-                break
-                
-            time.sleep(0.01)
+        # one report out before the loop starts, so the breakdown ends at the first pad update
+        running = controller.tick()
+        startup.mark('first report')
+        print(startup.format_report())
+        
+        if running:
+            if args.threaded:
+                handoff = run_threaded(controller, args.mode, args.rate)
+                if controller.profiler is not None:
+                    print(f"\nThreaded: {handoff.published} samples, {handoff.skipped} superseded before output")
+            elif args.mode == 'event':
+                run_event_driven(controller)
+            elif args.mode == 'fixed':
+                run_fixed_rate(controller, args.rate)
+            else:
+                run_poll(controller, 0.01)
             
     except RuntimeError as e:
         print(f"Error: {e}")
     finally:
-        controller.cleanup()
+        if controller is not None:
+            controller.cleanup()
+        if controller is not None and args.record:
+            # the recorder closes whatever it wraps, the replay included
+            recorder = controller.manager.device
+            recorder.close()
+            print(f"\nRecorded {recorder.writer.count} samples to {args.record}")
+        elif device is not None:
+            device.close()
+        if controller is not None:
+            if controller.profiler is not None:
+                print(controller.profiler.format_report())
+                if args.profile_json:
+                    controller.profiler.dump_json(args.profile_json)
+                    print(f"Profile written to {args.profile_json}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
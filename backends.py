@@ -0,0 +1,230 @@
+import math
+import os
+import time
+from array import array
+from typing import Iterable, List, Protocol, Sequence, Tuple
+
+from input_snapshot import InputSnapshot, capture
+
+# a raw device sample: (axes, button mask, hats)
+Sample = Tuple[Sequence[float], int, Tuple[Tuple[int, int], ...]]
+
+
+class InputDevice(Protocol):
+    """What JoystickManager needs from a stick."""
+    num_axes: int
+    num_buttons: int
+    num_hats: int
+
+    def read(self) -> InputSnapshot: ...
+    def enable_events(self): ...
+    def wait(self, timeout: float) -> bool: ...
+    def wake(self): ...
+
+
+class OutputPad(Protocol):
+    """The subset of vgamepad's VX360Gamepad that XusbReport.submit() drives."""
+    def press_button(self, button: int): ...
+    def release_button(self, button: int): ...
+    def left_joystick(self, x_value: int, y_value: int): ...
+    def right_joystick(self, x_value: int, y_value: int): ...
+    def left_trigger(self, value: int): ...
+    def right_trigger(self, value: int): ...
+    def update(self): ...
+    def reset(self): ...
+
+
+class PygameEvents:
+    """pygame setup and the event-queue side of an InputDevice, shared by the real inputs."""
+
+    def __init__(self):
+        os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+        import pygame
+        self.pygame = pygame
+        # only what joystick input needs: the event queue lives in the video
+        # subsystem, audio/fonts/etc from a blanket pygame.init() stay off
+        pygame.display.init()
+        pygame.joystick.init()
+
+        # events that mean the stick state changed, everything else is filtered out of the queue
+        self.input_events = (
+            pygame.JOYAXISMOTION,
+            pygame.JOYBUTTONDOWN,
+            pygame.JOYBUTTONUP,
+            pygame.JOYHATMOTION,
+        )
+        self.device_events = (pygame.JOYDEVICEADDED, pygame.JOYDEVICEREMOVED)
+        # posted from other threads (e.g. the keyboard kill switch) to wake a blocked wait
+        self.wake_event = pygame.USEREVENT
+
+    def enable_events(self):
+        # only joystick events wake the loop, mouse/window noise stays out of the queue
+        pygame = self.pygame
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(self.input_events) + list(self.device_events) + [
+            pygame.QUIT, self.wake_event
+        ])
+
+    def pump(self):
+        self.pygame.event.pump()
+
+    def wait(self, timeout: float) -> bool:
+        """Blocks until a joystick event arrives or timeout (seconds) passes, False on timeout."""
+        pygame = self.pygame
+        event = pygame.event.wait(max(1, int(timeout * 1000)))
+        if event.type == pygame.NOEVENT:
+            return False
+        if event.type in self.device_events:
+            self.devices_changed()
+        for event in pygame.event.get(self.device_events):
+            self.devices_changed()
+        # the caller reads current state directly, the events themselves aren't needed
+        pygame.event.clear()
+        return True
+
+    def devices_changed(self):
+        """Called when a joystick is plugged in or removed."""
+
+    def wake(self):
+        self.pygame.event.post(self.pygame.event.Event(self.wake_event))
+
+
+class PygameInput(PygameEvents):
+    """Physical joystick through pygame."""
+
+    def __init__(self, index: int = 0):
+        super().__init__()
+        pygame = self.pygame
+
+        # initialize joystick
+        if pygame.joystick.get_count() <= index:
+            raise RuntimeError("No joystick detected")
+
+        self.joystick = pygame.joystick.Joystick(index)
+        self.joystick.init()
+
+        self.num_axes = self.joystick.get_numaxes()
+        self.num_buttons = self.joystick.get_numbuttons()
+        self.num_hats = self.joystick.get_numhats()
+
+    def read(self) -> InputSnapshot:
+        """Pumps the event queue once and reads the whole device."""
+        self.pygame.event.pump()
+        return capture(self.joystick, self.num_axes, self.num_buttons,
+                       self.num_hats, time.perf_counter())
+
+
+class FakeInput:
+    """In-memory stick that plays back a list of samples, for benchmarks and soak runs."""
+
+    def __init__(self, samples: Iterable[Sample], num_axes: int = 4, num_buttons: int = 12,
+                 num_hats: int = 1, loop: bool = True):
+        self.num_axes = num_axes
+        self.num_buttons = num_buttons
+        self.num_hats = num_hats
+        self.loop = loop  # otherwise the last sample repeats and exhausted is set
+        # built once, read() only restamps them
+        self.samples = [InputSnapshot(0.0, array('d', axes), buttons, tuple(hats))
+                        for axes, buttons, hats in samples]
+        if not self.samples:
+            raise ValueError("FakeInput needs at least one sample")
+        for snapshot in self.samples:
+            if len(snapshot.axes) < num_axes or len(snapshot.hats) < num_hats:
+                raise ValueError("sample is smaller than the fake device")
+        self.position = 0
+        self.reads = 0
+        self.exhausted = False
+        self.woken = False
+
+    def read(self) -> InputSnapshot:
+        samples = self.samples
+        snapshot = samples[self.position]
+        self.position += 1
+        if self.position == len(samples):
+            if self.loop:
+                self.position = 0
+            else:
+                self.position -= 1
+                self.exhausted = True
+        self.reads += 1
+        return snapshot._replace(timestamp=time.perf_counter())
+
+    def enable_events(self):
+        pass
+
+    def wait(self, timeout: float) -> bool:
+        # a trace always has a "new" sample ready
+        return not self.exhausted
+
+    def wake(self):
+        self.woken = True
+
+
+class FakeGamepad:
+    """Stand-in for vgamepad's VX360Gamepad that keeps the report in memory."""
+
+    def __init__(self):
+        self.updates = 0
+        self.calls = 0  # every driver method call, update() included
+        self.last_update = None  # perf_counter() of the last update()
+        self._clear()
+
+    def reset(self):
+        self.calls += 1
+        self._clear()
+
+    def _clear(self):
+        self.buttons = 0
+        self.left_x = self.left_y = 0
+        self.right_x = self.right_y = 0
+        self.left_trigger_value = self.right_trigger_value = 0
+
+    def press_button(self, button: int):
+        self.calls += 1
+        self.buttons |= button
+
+    def release_button(self, button: int):
+        self.calls += 1
+        self.buttons &= ~button
+
+    def left_joystick(self, x_value: int, y_value: int):
+        self.calls += 1
+        self.left_x, self.left_y = x_value, y_value
+
+    def right_joystick(self, x_value: int, y_value: int):
+        self.calls += 1
+        self.right_x, self.right_y = x_value, y_value
+
+    def left_trigger(self, value: int):
+        self.calls += 1
+        self.left_trigger_value = value
+
+    def right_trigger(self, value: int):
+        self.calls += 1
+        self.right_trigger_value = value
+
+    def update(self):
+        self.calls += 1
+        self.updates += 1
+        self.last_update = time.perf_counter()
+
+
+def create_gamepad():
+    """The real virtual pad. vgamepad needs the ViGEmBus driver, so it's only imported here."""
+    import vgamepad as vg
+    return vg.VX360Gamepad()
+
+
+def synthetic_trace(num_samples: int, num_axes: int = 4, num_buttons: int = 12,
+                    num_hats: int = 1, seed: int = 0, exclude_mask: int = 0) -> List[Sample]:
+    """Smooth stick sweeps with button holds and hat flicks mixed in, never pressing exclude_mask."""
+    samples = []
+    for n in range(num_samples):
+        t = n / 1000.0
+        axes = [math.sin(t * (1.3 + 0.7 * i) + seed + i) * 1.05 for i in range(num_axes)]
+        held = (n // 150) % (num_buttons + 4)
+        buttons = ((1 << held) if held < num_buttons else 0) & ~exclude_mask
+        hat_step = (n // 400) % 5
+        hat = ((0, 0), (1, 0), (0, 1), (-1, 0), (0, -1))[hat_step]
+        samples.append((axes, buttons, tuple(hat for _ in range(num_hats))))
+    return samples
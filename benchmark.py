@@ -0,0 +1,282 @@
+"""Hardware-free benchmark of the full config.json pipeline, see README."""
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from ace_combat import AceCombatController
+from backends import FakeGamepad, FakeInput, synthetic_trace
+from devices import DeviceLayout, resolve_addresses
+from multiseat import SeatScheduler
+from profiler import LatencyHistogram, TickProfiler
+from recording import Recording
+
+# how much worse than the baseline a run may be before it counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+
+def load_config_shape():
+    """(kill switch button, fake device size) for the current config.json."""
+    try:
+        with open('config.json', 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return None, (4, 12, 1)
+    if 'devices' in config:
+        # multi-device configs address a merged snapshot, size the fake to match
+        layout = DeviceLayout(config['devices'])
+        config = resolve_addresses(config, layout)
+        size = (layout.num_axes, layout.num_buttons, layout.num_hats)
+    else:
+        size = (4, 12, 1)
+    return config.get('kill_switch', {}).get('button'), size
+
+
+def build_controller(samples, use_numpy: bool = False, num_axes: int = 4,
+                     num_buttons: int = 12, num_hats: int = 1):
+    device = FakeInput(samples, num_axes, num_buttons, num_hats)
+    pad = FakeGamepad()
+    controller = AceCombatController(use_numpy, device=device, gamepad=pad, hook_keyboard=False)
+    return controller, device, pad
+
+
+def measure_throughput(controller, ticks: int) -> float:
+    tick = controller.tick
+    start = time.perf_counter()
+    for _ in range(ticks):
+        tick()
+    return ticks / (time.perf_counter() - start)
+
+
+def measure_latency(controller, pad, ticks: int) -> LatencyHistogram:
+    # sample timestamp -> pad update(), only for ticks that actually reached the driver
+    latency = LatencyHistogram()
+    manager = controller.manager
+    for _ in range(ticks):
+        updates = pad.updates
+        controller.tick()
+        if pad.updates != updates:
+            latency.record(int((pad.last_update - manager.snapshot.timestamp) * 1e9))
+    return latency
+
+
+def measure_allocations(controller, ticks: int):
+    """(peak transient bytes per tick histogram, retained blocks per tick)."""
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    for _ in range(ticks):
+        controller.tick()
+    gc.collect()
+    retained = (sys.getallocatedblocks() - blocks_before) / ticks
+
+    transient = LatencyHistogram()  # bytes, not ns, same bucketing
+    tracemalloc.start()
+    try:
+        for _ in range(ticks):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            controller.tick()
+            _, peak = tracemalloc.get_traced_memory()
+            transient.record(peak - current)
+    finally:
+        tracemalloc.stop()
+    return transient, retained
+
+
+def run_benchmark(ticks: int = 50000, use_numpy: bool = False, samples=None, device_size=None) -> dict:
+    kill_button, config_size = load_config_shape()
+    if device_size is None:
+        device_size = config_size
+    exclude = (1 << kill_button) if isinstance(kill_button, int) else 0
+    if samples is None:
+        samples = synthetic_trace(10000, *device_size, exclude_mask=exclude)
+    else:
+        # a recorded session may press the kill switch, mask it out so the run doesn't stop
+        samples = [(axes, buttons & ~exclude, hats) for axes, buttons, hats in samples]
+    controller, device, pad = build_controller(samples, use_numpy, *device_size)
+
+    measure_throughput(controller, min(ticks, 2000))  # warm up
+    updates_before = pad.updates
+    ticks_per_sec = measure_throughput(controller, ticks)
+    updates_per_tick = (pad.updates - updates_before) / ticks
+
+    latency = measure_latency(controller, pad, ticks)
+    transient, retained = measure_allocations(controller, min(ticks, 10000))
+
+    profiler = TickProfiler()
+    controller.enable_profiling(profiler)
+    measure_throughput(controller, ticks)
+
+    return {
+        'ticks': ticks,
+        'numpy': use_numpy,
+        'ticks_per_sec': round(ticks_per_sec),
+        'driver_updates_per_tick': round(updates_per_tick, 4),
+        'latency': latency.summary(),
+        'alloc_bytes_per_tick': transient.summary(),
+        'retained_blocks_per_tick': round(retained, 4),
+        'profile': profiler.summary(),
+    }
+
+
+def seat_counts(max_seats: int):
+    counts = []
+    n = 1
+    while n < max_seats:
+        counts.append(n)
+        n *= 2
+    return counts + [max_seats]
+
+
+def run_seat_scaling(max_seats: int, rounds: int = 5000, use_numpy: bool = False) -> dict:
+    """Per-seat CPU and pump -> pad latency for 1, 2, 4 ... max_seats seats."""
+    kill_button, device_size = load_config_shape()
+    exclude = (1 << kill_button) if isinstance(kill_button, int) else 0
+    rows = []
+    for seats in seat_counts(max_seats):
+        controllers = {}
+        pads = []
+        for k in range(seats):
+            samples = synthetic_trace(10000, *device_size, seed=k, exclude_mask=exclude)
+            controllers[f'seat{k}'], _, pad = build_controller(samples, use_numpy, *device_size)
+            pads.append(pad)
+        scheduler = SeatScheduler(controllers)
+        for _ in range(min(rounds, 1000)):  # warm up
+            scheduler.round()
+
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        for _ in range(rounds):
+            scheduler.round()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+
+        latency = LatencyHistogram()
+        updates = [0] * seats
+        for _ in range(rounds):
+            for k, pad in enumerate(pads):
+                updates[k] = pad.updates
+            # from the round's shared pump, so later seats show the wait for earlier ones
+            start = time.perf_counter()
+            scheduler.round()
+            for k, pad in enumerate(pads):
+                if pad.updates != updates[k]:
+                    latency.record(int((pad.last_update - start) * 1e9))
+
+        rows.append({
+            'seats': seats,
+            'rounds_per_sec': round(rounds / wall),
+            'cpu_us_per_seat_tick': round(cpu / (rounds * seats) * 1e6, 2),
+            'latency': latency.summary(),
+        })
+    return {'rounds': rounds, 'numpy': use_numpy, 'scaling': rows}
+
+
+def format_scaling(results: dict) -> str:
+    lines = [
+        "=== Multi-seat Scaling ===",
+        f"Path: {'numpy' if results['numpy'] else 'python'}, {results['rounds']} rounds per seat count",
+        "",
+        f"{'seats':>5} {'rounds/s':>9} {'cpu us/seat':>12} {'lat p50 us':>11} {'lat p99 us':>11} {'lat max us':>11}",
+    ]
+    for row in results['scaling']:
+        latency = row['latency']
+        lines.append(f"{row['seats']:>5} {row['rounds_per_sec']:>9} {row['cpu_us_per_seat_tick']:>12.2f} "
+                     f"{latency['p50_ns'] / 1000:>11.1f} {latency['p99_ns'] / 1000:>11.1f} "
+                     f"{latency['max_ns'] / 1000:>11.1f}")
+    return "\n".join(lines)
+
+
+def format_results(results: dict) -> str:
+    latency = results['latency']
+    alloc = results['alloc_bytes_per_tick']
+    lines = [
+        "=== Pipeline Benchmark ===",
+        f"Path: {'numpy' if results['numpy'] else 'python'}, {results['ticks']} ticks",
+        f"Throughput: {results['ticks_per_sec']} ticks/s",
+        f"Driver updates per tick: {results['driver_updates_per_tick']}",
+        f"Input->pad latency (us): p50 {latency['p50_ns'] / 1000:.1f}  "
+        f"p99 {latency['p99_ns'] / 1000:.1f}  max {latency['max_ns'] / 1000:.1f}",
+        f"Transient bytes per tick: p50 {alloc['p50_ns']}  p99 {alloc['p99_ns']}  max {alloc['max_ns']}",
+        f"Retained blocks per tick: {results['retained_blocks_per_tick']}",
+        "",
+        f"{'stage':>10} {'p50 us':>9} {'p99 us':>9}",
+    ]
+    for name, stage in results['profile']['stages'].items():
+        lines.append(f"{name:>10} {stage['p50_ns'] / 1000:>9.2f} {stage['p99_ns'] / 1000:>9.2f}")
+    return "\n".join(lines)
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """Returns a list of regressions, empty if the run is within tolerance."""
+    problems = []
+    if results['ticks_per_sec'] < baseline['ticks_per_sec'] * (1 - tolerance):
+        problems.append(f"throughput {results['ticks_per_sec']} ticks/s vs baseline {baseline['ticks_per_sec']}")
+    p99, base_p99 = results['latency']['p99_ns'], baseline['latency']['p99_ns']
+    if p99 > base_p99 * (1 + tolerance):
+        problems.append(f"latency p99 {p99} ns vs baseline {base_p99} ns")
+    # anything retained per tick is a leak, allow only measurement noise
+    if results['retained_blocks_per_tick'] > max(baseline['retained_blocks_per_tick'], 0) + 0.01:
+        problems.append(f"retained {results['retained_blocks_per_tick']} blocks/tick "
+                        f"vs baseline {baseline['retained_blocks_per_tick']}")
+    if results['driver_updates_per_tick'] > baseline['driver_updates_per_tick'] * (1 + tolerance):
+        problems.append(f"{results['driver_updates_per_tick']} driver updates/tick "
+                        f"vs baseline {baseline['driver_updates_per_tick']}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the mapping pipeline without hardware")
+    parser.add_argument('--ticks', type=int, default=50000)
+    parser.add_argument('--numpy', action='store_true', help="benchmark the vectorized axis path")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="drive the pipeline with a recording (ace_combat.py --record) instead of synthetic input")
+    parser.add_argument('--json', metavar='FILE', help="write results to FILE")
+    parser.add_argument('--baseline', metavar='FILE', help="fail if slower than this saved run")
+    parser.add_argument('--save-baseline', metavar='FILE', help="save this run as a baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed regression vs baseline (fraction, default 0.2)")
+    parser.add_argument('--seats', type=int, metavar='N',
+                        help="measure multi-seat scaling from 1 to N seats instead (rounds = --ticks / 10)")
+    args = parser.parse_args(argv)
+
+    if args.seats:
+        results = run_seat_scaling(args.seats, max(args.ticks // 10, 100), args.numpy)
+        print(format_scaling(results))
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=4)
+        return 0
+
+    if args.trace:
+        recording = Recording(args.trace)
+        samples = recording.samples(limit=100000)
+        device_size = (recording.num_axes, recording.num_buttons, recording.num_hats)
+        recording.close()
+        results = run_benchmark(args.ticks, args.numpy, samples, device_size)
+    else:
+        results = run_benchmark(args.ticks, args.numpy)
+    print(format_results(results))
+
+    for path in (args.json, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        problems = compare(results, baseline, args.tolerance)
+        if problems:
+            print("\nREGRESSION:")
+            for problem in problems:
+                print(f"- {problem}")
+            return 1
+        print("\nWithin tolerance of baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
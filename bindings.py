@@ -0,0 +1,373 @@
+import heapq
+from typing import Dict, List, Tuple
+
+# XUSB button value map (same values as vgamepad's XUSB_BUTTON)
+XUSB_BUTTONS = {
+    'XUSB_GAMEPAD_DPAD_UP': 0x0001,
+    'XUSB_GAMEPAD_DPAD_DOWN': 0x0002,
+    'XUSB_GAMEPAD_DPAD_LEFT': 0x0004,
+    'XUSB_GAMEPAD_DPAD_RIGHT': 0x0008,
+    'XUSB_GAMEPAD_START': 0x0010,
+    'XUSB_GAMEPAD_BACK': 0x0020,
+    'XUSB_GAMEPAD_LEFT_THUMB': 0x0040,
+    'XUSB_GAMEPAD_RIGHT_THUMB': 0x0080,
+    'XUSB_GAMEPAD_LEFT_SHOULDER': 0x0100,
+    'XUSB_GAMEPAD_RIGHT_SHOULDER': 0x0200,
+    'XUSB_GAMEPAD_GUIDE': 0x0400,
+    'XUSB_GAMEPAD_A': 0x1000,
+    'XUSB_GAMEPAD_B': 0x2000,
+    'XUSB_GAMEPAD_X': 0x4000,
+    'XUSB_GAMEPAD_Y': 0x8000,
+}
+
+# axes a combo is allowed to take over, as bits of the disabled mask
+DISABLEABLE_AXES = {
+    'throttle': 0x01,
+}
+
+ANALOG_OUTPUTS = ('left_trigger', 'right_trigger')
+
+# 'hold' is the classic level-triggered combo, the others are edge-driven and timed
+COMBO_MODES = ('hold', 'long_press', 'tap', 'double_tap', 'sequence')
+TIMED_MODES = COMBO_MODES[1:]
+
+# timing windows in ms, overridable in bindings['timing'] and per combo
+DEFAULT_TIMING = {
+    'hold_ms': 400,    # long_press: held at least this long
+    'tap_ms': 200,     # tap: released within this long
+    'window_ms': 300,  # double_tap / sequence: max gap between presses
+    'pulse_ms': 80,    # how long tap, double_tap and sequence combos stay active
+}
+
+# layout of one packed lookup-table entry
+XUSB_BITS = 0xFFFF
+DISABLED_SHIFT = 16
+DISABLED_BITS = 0xFF
+COMBO_SHIFT = 24
+
+
+class CompiledBindings:
+    """bindings['standard'] + bindings['combos'] compiled into integer tables."""
+
+    def __init__(self, per_button: Dict[int, int], combo_names: List[str],
+                 analog: List[Tuple[int, float, float]], timed: List['TimedCombo'] = None):
+        self.combo_names = list(combo_names)
+        self.timed = TimedCombos(timed) if timed else None
+        # (combo bit, left trigger, right trigger) for combos that drive the triggers
+        self.analog = tuple(analog)
+        self.analog_mask = 0
+        for bit, _, _ in self.analog:
+            self.analog_mask |= bit
+
+        # every output is an OR over held buttons, so it's precomputed per byte of the mask:
+        # a tick is one 256-entry lookup per byte
+        num_groups = (max(per_button) // 8 + 1) if per_button else 0
+        tables = []
+        for group in range(num_groups):
+            table = [0] * 256
+            for byte in range(1, 256):
+                entry = 0
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        entry |= per_button.get(group * 8 + bit, 0)
+                table[byte] = entry
+            tables.append((group * 8, tuple(table)))
+        self.tables = tuple(tables)
+
+        # results of the last evaluate()
+        self.xusb = 0
+        self.disabled = 0
+        self.active = 0
+        # when the next combo timer is due (same clock as evaluate's now) or None, one attribute
+        # so the --threaded display/wait side reads it without touching the timer heap
+        self.next_deadline = None
+
+    def evaluate(self, buttons: int, now: float = 0.0) -> int:
+        """Resolves a source button mask at time now (seconds); returns the XUSB button word."""
+        entry = 0
+        for shift, table in self.tables:
+            entry |= table[(buttons >> shift) & 0xFF]
+        timed = self.timed
+        if timed is not None:
+            entry |= timed.update(buttons, now)
+            timers = timed.timers
+            self.next_deadline = timers[0][0] if timers else None
+        self.xusb = entry & XUSB_BITS
+        self.disabled = (entry >> DISABLED_SHIFT) & DISABLED_BITS
+        self.active = entry >> COMBO_SHIFT
+        return self.xusb
+
+    def reset(self, buttons: int):
+        """Forgets combo state, treating the buttons held now as already down."""
+        self.xusb = self.disabled = self.active = 0
+        self.next_deadline = None
+        if self.timed is not None:
+            self.timed.reset(buttons)
+
+    def analog_override(self):
+        """(left, right) trigger values of the last active analog combo, or None."""
+        if not self.active & self.analog_mask:
+            return None
+        override = None
+        for bit, left, right in self.analog:
+            if self.active & bit:
+                override = (left, right)
+        return override
+
+    def active_names(self) -> List[str]:
+        return [name for i, name in enumerate(self.combo_names) if self.active & (1 << i)]
+
+
+class TimedCombo:
+    """State machine for one long_press / tap / double_tap / sequence combo."""
+
+    __slots__ = ('mode', 'entry', 'buttons', 'hold', 'tap', 'window', 'pulse',
+                 'pressed_at', 'last_press', 'step', 'active', 'generation')
+
+    def __init__(self, mode: str, entry: int, buttons: Tuple[int, ...], timing: Dict[str, float]):
+        self.mode = mode
+        self.entry = entry  # packed like a table entry
+        self.buttons = buttons  # the trigger, or the whole sequence
+        self.hold = timing['hold_ms'] / 1000
+        self.tap = timing['tap_ms'] / 1000
+        self.window = timing['window_ms'] / 1000
+        self.pulse = timing['pulse_ms'] / 1000
+        self.pressed_at = None
+        self.last_press = None
+        self.step = 0
+        self.active = False
+        self.generation = 0  # bumped to invalidate a pending timer
+
+    def press(self, button: int, now: float, timers: 'TimedCombos'):
+        mode = self.mode
+        if mode == 'long_press':
+            self.pressed_at = now
+            timers.schedule(now + self.hold, self)
+        elif mode == 'tap':
+            self.pressed_at = now
+        elif mode == 'double_tap':
+            if self.last_press is not None and now - self.last_press <= self.window:
+                self.last_press = None
+                self.fire(now, timers)
+            else:
+                self.last_press = now
+        else:
+            sequence = self.buttons
+            in_time = self.last_press is not None and now - self.last_press <= self.window
+            if button == sequence[self.step] and (self.step == 0 or in_time):
+                self.step += 1
+            else:
+                # wrong button or too slow, this press may still start a new attempt
+                self.step = 1 if button == sequence[0] else 0
+            self.last_press = now
+            if self.step == len(sequence):
+                self.step = 0
+                self.fire(now, timers)
+
+    def release(self, button: int, now: float, timers: 'TimedCombos'):
+        if self.mode == 'long_press':
+            self.pressed_at = None
+            self.generation += 1
+            if self.active:
+                self.active = False
+                timers.changed = True
+        elif self.mode == 'tap':
+            if self.pressed_at is not None and now - self.pressed_at <= self.tap:
+                self.fire(now, timers)
+            self.pressed_at = None
+
+    def fire(self, now: float, timers: 'TimedCombos'):
+        # on for pulse_ms, long enough for the game to see the press
+        self.active = True
+        timers.changed = True
+        timers.schedule(now + self.pulse, self)
+
+    def expire(self, timers: 'TimedCombos'):
+        if self.mode == 'long_press' and not self.active:
+            self.active = True  # held past hold_ms, stays on until release
+        else:
+            self.active = False
+        timers.changed = True
+
+
+class TimedCombos:
+    """Drives the timed combos from button edges and a deadline heap."""
+
+    def __init__(self, combos: List[TimedCombo]):
+        self.combos = tuple(combos)
+        listeners = {}
+        for combo in self.combos:
+            for button in set(combo.buttons):
+                listeners.setdefault(button, []).append(combo)
+        self.listeners = {button: tuple(combos) for button, combos in listeners.items()}
+        self.watch_mask = 0
+        for button in self.listeners:
+            self.watch_mask |= 1 << button
+        self.timers = []  # heap of (deadline, sequence, combo, generation)
+        self._sequence = 0
+        self.last_buttons = 0
+        self.entry = 0
+        self.changed = False
+
+    def reset(self, buttons: int):
+        for combo in self.combos:
+            combo.pressed_at = combo.last_press = None
+            combo.step = 0
+            combo.active = False
+            combo.generation += 1
+        self.timers = []
+        self.last_buttons = buttons
+        self.entry = 0
+        self.changed = False
+
+    def schedule(self, deadline: float, combo: TimedCombo):
+        combo.generation += 1
+        self._sequence += 1
+        heapq.heappush(self.timers, (deadline, self._sequence, combo, combo.generation))
+
+    def update(self, buttons: int, now: float) -> int:
+        """Packed entry of every active timed combo after processing edges and due timers."""
+        edges = (buttons ^ self.last_buttons) & self.watch_mask
+        self.last_buttons = buttons
+        # only changed buttons are dispatched, a tick with no edges and nothing due is two comparisons
+        while edges:
+            low = edges & -edges
+            edges ^= low
+            button = low.bit_length() - 1
+            if buttons & low:
+                for combo in self.listeners[button]:
+                    combo.press(button, now, self)
+            else:
+                for combo in self.listeners[button]:
+                    combo.release(button, now, self)
+
+        timers = self.timers
+        while timers and timers[0][0] <= now:
+            _, _, combo, generation = heapq.heappop(timers)
+            if generation == combo.generation:
+                combo.expire(self)
+
+        if self.changed:
+            self.changed = False
+            entry = 0
+            for combo in self.combos:
+                if combo.active:
+                    entry |= combo.entry
+            self.entry = entry
+        return self.entry
+
+
+def _source_button(value, what: str, num_buttons: int = None) -> int:
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise RuntimeError(f"Invalid button mapping for {what}: button {value!r} is not a button index")
+    if num_buttons is not None and value >= num_buttons:
+        raise RuntimeError(f"Invalid button mapping for {what}: button {value} does not exist "
+                           f"(device has {num_buttons})")
+    return value
+
+
+def _xusb_mask(name, what: str) -> int:
+    if not isinstance(name, str) or name not in XUSB_BUTTONS:
+        raise RuntimeError(f"Invalid button mapping for {what}: unknown XUSB button {name!r}")
+    return XUSB_BUTTONS[name]
+
+
+def _timing(settings: Dict, defaults: Dict[str, float], what: str) -> Dict[str, float]:
+    timing = dict(defaults)
+    for key in DEFAULT_TIMING:
+        if key in settings:
+            value = settings[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+                raise RuntimeError(f"Invalid timing for {what}: {key} must be a positive number of ms")
+            timing[key] = float(value)
+    return timing
+
+
+def _entries(bindings: Dict, section: str):
+    # (name, entry) pairs of bindings[section], every entry must be an object
+    entries = bindings.get(section, {})
+    if not isinstance(entries, dict):
+        raise RuntimeError(f"Invalid bindings: {section} must be an object of name -> mapping")
+    for name, entry in entries.items():
+        if not isinstance(entry, dict):
+            kind = 'button' if section == 'standard' else 'combo'
+            raise RuntimeError(f"Invalid {kind} mapping for {name}: expected an object, got {entry!r}")
+    return entries.items()
+
+
+def _name_list(combo: Dict, key: str, combo_name: str) -> List:
+    values = combo.get(key, [])
+    if not isinstance(values, list):
+        raise RuntimeError(f"Invalid combo mapping for {combo_name}: {key} must be a list")
+    return values
+
+
+def compile_bindings(bindings: Dict, num_buttons: int = None) -> CompiledBindings:
+    """Validates and compiles a config's 'bindings' section, raises RuntimeError on the first invalid entry."""
+    if not isinstance(bindings, dict):
+        raise RuntimeError("Invalid bindings: expected an object with standard / combos")
+    per_button = {}
+    timing_defaults = _timing(bindings.get('timing', {}), DEFAULT_TIMING, "bindings timing")
+
+    def add(button, entry):
+        per_button[button] = per_button.get(button, 0) | entry
+
+    for action, binding in _entries(bindings, 'standard'):
+        button = binding.get('button')
+        if button is None:
+            continue
+        button = _source_button(button, action, num_buttons)
+        add(button, _xusb_mask(binding.get('xusb'), action))
+
+    combo_names = []
+    analog = []
+    timed = []
+    for combo_name, combo in _entries(bindings, 'combos'):
+        what = f"combo {combo_name}"
+        mode = combo.get('mode', 'hold')
+        if mode not in COMBO_MODES:
+            raise RuntimeError(f"Invalid combo mapping for {combo_name}: mode must be one of {', '.join(COMBO_MODES)}")
+        if mode == 'sequence':
+            sequence = combo.get('sequence')
+            if not isinstance(sequence, list) or len(sequence) < 2:
+                raise RuntimeError(f"Invalid combo mapping for {combo_name}: sequence needs a list of at least 2 buttons")
+            sources = tuple(_source_button(b, what, num_buttons) for b in sequence)
+        else:
+            trigger = combo.get('trigger')
+            if trigger is None:
+                continue
+            sources = (_source_button(trigger, what, num_buttons),)
+        combo_bit = 1 << len(combo_names)
+        combo_names.append(combo_name)
+
+        xusb = 0
+        for xusb_name in _name_list(combo, 'xusb', combo_name):
+            xusb |= _xusb_mask(xusb_name, what)
+
+        disabled = 0
+        for axis in _name_list(combo, 'disable_axes', combo_name):
+            if not isinstance(axis, str) or axis not in DISABLEABLE_AXES:
+                raise RuntimeError(f"Invalid combo mapping for {combo_name}: axis {axis!r} can't be disabled "
+                                   f"(supported: {', '.join(DISABLEABLE_AXES)})")
+            disabled |= DISABLEABLE_AXES[axis]
+
+        values = combo.get('analog')
+        if values is True:
+            values = dict.fromkeys(ANALOG_OUTPUTS, 1.0)  # both triggers fully pressed
+        elif values is not None and values is not False and not isinstance(values, dict):
+            raise RuntimeError(f"Invalid combo mapping for {combo_name}: analog must be true or an object of "
+                               f"{' / '.join(ANALOG_OUTPUTS)} values")
+        if values:
+            for key, value in values.items():
+                if key not in ANALOG_OUTPUTS or isinstance(value, bool) or not isinstance(value, (int, float)):
+                    raise RuntimeError(f"Invalid combo mapping for {combo_name}: bad analog entry {key!r}: {value!r}")
+            analog.append((combo_bit, float(values.get('left_trigger', 1.0)),
+                           float(values.get('right_trigger', 1.0))))
+
+        entry = xusb | (disabled << DISABLED_SHIFT) | (combo_bit << COMBO_SHIFT)
+        if mode == 'hold':
+            add(sources[0], entry)
+        else:
+            timed.append(TimedCombo(mode, entry, sources, _timing(combo, timing_defaults, what)))
+
+    return CompiledBindings(per_button, combo_names, analog, timed)
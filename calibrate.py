@@ -4,27 +4,76 @@ import json
 import time
 from joystick_manager import JoystickManager
 
+# deadzone = noise floor * margin, never tighter than MIN_DEADZONE
+DEADZONE_MARGIN = 1.5
+MIN_DEADZONE = 0.02
+MAX_DEADZONE = 0.5
+
+# how long each measuring phase listens, and how often a wait re-checks the skip key
+HOLD_STILL_SECONDS = 3.0
+EVENT_TIMEOUT_MS = 100
+
+class RunningStats:
+    """Streaming mean / variance (Welford) plus min and max for one axis."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def std(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+    @property
+    def spread(self):
+        """Largest distance from the mean seen so far."""
+        return max(self.max - self.mean, self.mean - self.min) if self.count else 0.0
+
+def is_from(event, joystick):
+    # other sticks plugged in next to the one being calibrated are ignored
+    return getattr(event, 'instance_id', None) == joystick.get_instance_id()
+
+def next_event(joystick, skip_key='s'):
+    """Blocks for the next event from this joystick. None means the skip key was pressed."""
+    while True:
+        event = pygame.event.wait(EVENT_TIMEOUT_MS)
+        if event.type != pygame.NOEVENT:
+            if is_from(event, joystick):
+                return event
+            continue
+        # skip check
+        if keyboard.is_pressed(skip_key):
+            time.sleep(0.2)
+            return None
+
 def wait_for_button_press(joystick, skip_key='s'):
     pygame.event.clear()
     print(f"(Press '{skip_key}' to skip)")
     
     while True:
-        pygame.event.pump()
-        
-        # skip check
-        if keyboard.is_pressed(skip_key):
-            time.sleep(0.2)
+        event = next_event(joystick, skip_key)
+        if event is None:
             return None
-            
-        # joystick buttons
-        for i in range(joystick.get_numbuttons()):
-            if joystick.get_button(i):
-                while joystick.get_button(i):
-                    pygame.event.pump()
-                    time.sleep(0.1)
-                return i
-                
-        time.sleep(0.1)
+        if event.type == pygame.JOYBUTTONDOWN:
+            # wait for release so the same press doesn't answer the next question
+            while True:
+                released = pygame.event.wait()
+                if released.type == pygame.JOYBUTTONUP and is_from(released, joystick) \
+                        and released.button == event.button:
+                    return event.button
 
 def wait_for_axis_movement(joystick, threshold=0.5):
     pygame.event.clear()
@@ -32,14 +81,83 @@ def wait_for_axis_movement(joystick, threshold=0.5):
     print("Move the desired axis...")
     
     while True:
-        pygame.event.pump()
-        for i in range(joystick.get_numaxes()):
-            current = joystick.get_axis(i)
-            if abs(current - initial_values[i]) > threshold:
-                # Wait for centerng
-                time.sleep(0.5)
-                return i
-        time.sleep(0.1)
+        event = pygame.event.wait()
+        if event.type == pygame.JOYAXISMOTION and is_from(event, joystick) \
+                and abs(event.value - initial_values[event.axis]) > threshold:
+            # Wait for centerng
+            time.sleep(0.5)
+            return event.axis
+
+def measure_hold_still(joystick, axis_ids, seconds=HOLD_STILL_SECONDS):
+    """Streams every axis event for a few seconds into per-axis stats."""
+    stats = {axis_id: RunningStats() for axis_id in axis_ids}
+    for axis_id in axis_ids:
+        stats[axis_id].add(joystick.get_axis(axis_id))
+    pygame.event.clear()
+    deadline = time.perf_counter() + seconds
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return stats
+        event = pygame.event.wait(max(1, int(remaining * 1000)))
+        if event.type == pygame.JOYAXISMOTION and is_from(event, joystick) and event.axis in stats:
+            stats[event.axis].add(event.value)
+
+def measure_sweep(joystick, axis_ids, skip_key='s'):
+    """Streams axis events into per-axis stats until any joystick button is pressed."""
+    stats = {axis_id: RunningStats() for axis_id in axis_ids}
+    for axis_id in axis_ids:
+        stats[axis_id].add(joystick.get_axis(axis_id))
+    pygame.event.clear()
+    while True:
+        event = next_event(joystick, skip_key)
+        if event is None or event.type == pygame.JOYBUTTONDOWN:
+            return stats
+        if event.type == pygame.JOYAXISMOTION and event.axis in stats:
+            stats[event.axis].add(event.value)
+
+def measured_calibration(rest, sweep):
+    """(calibration entry, deadzone) from the two phases, or None if the axis barely moved."""
+    center = rest.mean
+    low, high = min(sweep.min, rest.min), max(sweep.max, rest.max)
+    if high - center < 0.2 or center - low < 0.2:
+        return None
+    # noise in the units the deadzone is applied in, i.e. after rescaling to the measured range
+    noise = max(rest.spread, 3 * rest.std) / min(high - center, center - low)
+    deadzone = min(max(noise * DEADZONE_MARGIN, MIN_DEADZONE), MAX_DEADZONE)
+    calibration = {
+        'center': round(center, 4),
+        'min': round(low, 4),
+        'max': round(high, 4),
+        'noise': round(rest.std, 5),
+    }
+    return calibration, round(deadzone, 3)
+
+def calibrate_ranges(manager, axis_map):
+    print("\nRange Calibration")
+    print("-----------------")
+    axis_ids = sorted(set(axis_map.values()))
+    
+    print("\nCenter the stick and twist, put the throttle where you want its center, then let go.")
+    print(f"Hold still, measuring noise for {HOLD_STILL_SECONDS:.0f} seconds...")
+    time.sleep(1.0)
+    rest = measure_hold_still(manager.joystick, axis_ids)
+    
+    print("\nNow sweep every axis through its full range a few times.")
+    print("Press any joystick button when done (or 's' to skip)")
+    sweep = measure_sweep(manager.joystick, axis_ids)
+    
+    results = {}
+    for axis_name, axis_id in axis_map.items():
+        measured = measured_calibration(rest[axis_id], sweep[axis_id])
+        if measured is None:
+            print(f"{axis_name}: not enough movement, keeping the current deadzone")
+            continue
+        results[axis_name] = measured
+        calibration, deadzone = measured
+        print(f"{axis_name}: center {calibration['center']:+.3f}, range {calibration['min']:+.3f}..{calibration['max']:+.3f}, "
+              f"noise {calibration['noise']:.4f} -> deadzone {deadzone:.3f}")
+    return results
 
 def calibrate_axes(manager):
     print("\nAxis Calibration")
@@ -96,31 +214,34 @@ def check_axis_conflicts(config, axis_map):
     
     return conflicts
 
-def calibrate_hat(joystick):
+def calibrate_hat(joystick, skip_key='s'):
     print("\nHat Switch Calibration")
     print("---------------------")
-    print("Move the hat switch/POV hat in any direction...")
     
-    pygame.event.clear()
-    found_hat = False
+    if joystick.get_numhats() == 0:
+        return False
+    print(f"Move the hat switch/POV hat in any direction... (Press '{skip_key}' to skip)")
     
-    for i in range(joystick.get_numhats()):
-        while not found_hat:
-            pygame.event.pump()
-            hat = joystick.get_hat(i)
-            if hat != (0, 0):
-                found_hat = True
-                print(f"Hat switch detected at index {i}")
-                time.sleep(0.5)
-                break
-            time.sleep(0.1)
-    
-    return found_hat
+    pygame.event.clear()
+    while True:
+        event = next_event(joystick, skip_key)
+        if event is None:
+            return False
+        if event.type == pygame.JOYHATMOTION and event.value != (0, 0):
+            print(f"Hat switch detected at index {event.hat}")
+            time.sleep(0.5)
+            return True
 
 def calibrate():
-    manager = JoystickManager()
     with open('config.json', 'r') as f:
         config = json.load(f)
+    if 'devices' in config:
+        # answers would be recorded against one stick and saved as bare indices
+        print("Error: calibrate.py only supports single-device configs. With a devices section, "
+              "set [\"device\", index] addresses in config.json by hand.")
+        return
+    manager = JoystickManager()
+    manager.enable_input_events()  # only joystick events reach the queue
     
     print("Starting calibration...")
     print("Press 's' to skip any binding")
@@ -132,6 +253,11 @@ def calibrate():
         config['axes'][axis_name] = config['axes'].get(axis_name, {})
         config['axis_mapping'][axis_name] = axis_id
     
+    # Measure noise floor and range
+    for axis_name, (calibration, deadzone) in calibrate_ranges(manager, axis_map).items():
+        config['axes'][axis_name]['calibration'] = calibration
+        config['axes'][axis_name]['deadzone'] = deadzone
+    
     # Calibrate hat switch
     print("\nChecking for hat switch...")
     if calibrate_hat(manager.joystick):
@@ -152,6 +278,9 @@ def calibrate():
     print("\nNow, let's map the combo trigger buttons...")
     for combo_name, combo in config['bindings']['combos'].items():
         print(f"\nCombo: {combo_name}")
+        if combo.get('mode') == 'sequence':
+            print("Sequence combo, edit its buttons in config.json")
+            continue
         print("Press the button that will trigger this combo")
         button_id = wait_for_button_press(manager.joystick)
         if button_id is not None:
@@ -170,7 +299,10 @@ def calibrate():
     print("\nCalibration complete!")
     print("\nConfigured combos:")
     for combo_name, combo in config['bindings']['combos'].items():
-        print(f"- {combo_name}: Button {combo['trigger']}")
+        if combo.get('mode') == 'sequence':
+            print(f"- {combo_name}: Buttons {' -> '.join(str(b) for b in combo.get('sequence', []))}")
+        else:
+            print(f"- {combo_name}: Button {combo.get('trigger')} ({combo.get('mode', 'hold')})")
         if combo.get('disable_axes'):
             print(f"  Disables: {', '.join(combo['disable_axes'])}")
     
@@ -0,0 +1,54 @@
+import json
+import os
+import threading
+
+# how often the control loop may stat the config file
+CHECK_INTERVAL = 0.5
+
+
+class ConfigWatcher:
+    """Notices config.json edits and compiles them on a background thread."""
+
+    def __init__(self, path: str, build, interval: float = CHECK_INTERVAL):
+        self.path = path
+        self.build = build  # config dict -> compiled mapping, raises RuntimeError if invalid
+        self.interval = interval
+        self.next_check = 0.0
+        self.mtime = self._mtime()
+        self.building = False
+        self.ready = None
+
+    def _mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self, now: float):
+        """Returns a newly built mapping once one is ready, otherwise None. Stats the file at most once per interval."""
+        ready = self.ready
+        if ready is not None:
+            self.ready = None
+            return ready
+        if now < self.next_check or self.building:
+            return None
+        self.next_check = now + self.interval
+
+        mtime = self._mtime()
+        if mtime is None or mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        self.building = True
+        threading.Thread(target=self._build, name="config-reload", daemon=True).start()
+        return None
+
+    def _build(self):
+        try:
+            with open(self.path, 'r') as f:
+                config = json.load(f)
+            self.ready = self.build(config)
+        except Exception as e:
+            # a half-edited file can trip anything in the compilers, none of it may kill the thread silently
+            print(f"\nConfig reload failed, keeping the current config: {e}")
+        finally:
+            self.building = False
@@ -0,0 +1,164 @@
+from array import array
+from typing import Callable, Dict, Sequence
+
+# lookup table intervals across the full -1..1 input range
+LUT_SIZE = 2048
+LUT_HALF = LUT_SIZE / 2
+
+CURVE_TYPES = ('linear', 'expo', 'power', 's_curve', 'spline')
+
+
+def _expo(amount: float) -> Callable[[float], float]:
+    # classic RC expo, blends linear and cubic
+    return lambda x: (1 - amount) * x + amount * x * x * x
+
+
+def _power(exponent: float) -> Callable[[float], float]:
+    return lambda x: x ** exponent
+
+
+def _s_curve(strength: float) -> Callable[[float], float]:
+    # flat near center and near full deflection, steep through the middle
+    def curve(x):
+        if x <= 0:
+            return 0.0
+        if x >= 1:
+            return 1.0
+        a = x ** strength
+        return a / (a + (1 - x) ** strength)
+    return curve
+
+
+def _spline(points: Sequence[Sequence[float]]) -> Callable[[float], float]:
+    """Monotone cubic (Fritsch-Carlson) through the control points, no overshoot."""
+    xs = [float(p[0]) for p in points]
+    ys = [float(p[1]) for p in points]
+    n = len(xs)
+    slopes = [(ys[i + 1] - ys[i]) / (xs[i + 1] - xs[i]) for i in range(n - 1)]
+    tangents = [slopes[0]] + [0.0] * (n - 2) + [slopes[-1]]
+    for i in range(1, n - 1):
+        if slopes[i - 1] * slopes[i] > 0:
+            tangents[i] = (slopes[i - 1] + slopes[i]) / 2
+    for i in range(n - 1):
+        if slopes[i] == 0:
+            tangents[i] = tangents[i + 1] = 0.0
+            continue
+        a, b = tangents[i] / slopes[i], tangents[i + 1] / slopes[i]
+        h = a * a + b * b
+        if h > 9:
+            t = 3 / h ** 0.5
+            tangents[i], tangents[i + 1] = t * a * slopes[i], t * b * slopes[i]
+
+    def curve(x):
+        i = 0
+        while i < n - 2 and x > xs[i + 1]:
+            i += 1
+        width = xs[i + 1] - xs[i]
+        t = min(max((x - xs[i]) / width, 0.0), 1.0)
+        t2, t3 = t * t, t * t * t
+        return ((2 * t3 - 3 * t2 + 1) * ys[i] + (t3 - 2 * t2 + t) * width * tangents[i]
+                + (-2 * t3 + 3 * t2) * ys[i + 1] + (t3 - t2) * width * tangents[i + 1])
+    return curve
+
+
+def _number(settings: Dict, key: str, default: float, axis_name: str, what: str = 'curve') -> float:
+    value = settings.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise RuntimeError(f"Invalid {what} for axis {axis_name}: {key} must be a number")
+    return float(value)
+
+
+def parse_curve(curve, axis_name: str):
+    """Turns a config 'curve' entry (see README) into f(x) on 0..1, or None for linear."""
+    if curve is None:
+        return None
+    if isinstance(curve, list):
+        curve = {'type': 'spline', 'points': curve}
+    if not isinstance(curve, dict) or curve.get('type') not in CURVE_TYPES:
+        raise RuntimeError(f"Invalid curve for axis {axis_name}: type must be one of {', '.join(CURVE_TYPES)}")
+
+    kind = curve['type']
+    if kind == 'linear':
+        return None
+    if kind == 'expo':
+        amount = _number(curve, 'amount', 0.3, axis_name)
+        if not 0 <= amount <= 1:
+            raise RuntimeError(f"Invalid curve for axis {axis_name}: expo amount must be between 0 and 1")
+        return _expo(amount)
+    if kind == 'power':
+        exponent = _number(curve, 'exponent', 2.0, axis_name)
+        if exponent <= 0:
+            raise RuntimeError(f"Invalid curve for axis {axis_name}: power exponent must be positive")
+        return _power(exponent)
+    if kind == 's_curve':
+        strength = _number(curve, 'strength', 2.0, axis_name)
+        if strength <= 0:
+            raise RuntimeError(f"Invalid curve for axis {axis_name}: s_curve strength must be positive")
+        return _s_curve(strength)
+
+    points = curve.get('points')
+    try:
+        points = sorted([(float(x), float(y)) for x, y in points])
+    except (TypeError, ValueError):
+        raise RuntimeError(f"Invalid curve for axis {axis_name}: spline points must be [x, y] pairs")
+    if points and points[0][0] > 0:
+        points.insert(0, (0.0, 0.0))
+    if points and points[-1][0] < 1:
+        points.append((1.0, points[-1][1]))
+    if len(points) < 2 or points[0][0] < 0 or points[-1][0] > 1:
+        raise RuntimeError(f"Invalid curve for axis {axis_name}: spline points must lie within 0..1")
+    if any(points[i][0] == points[i + 1][0] for i in range(len(points) - 1)):
+        raise RuntimeError(f"Invalid curve for axis {axis_name}: spline points need distinct x values")
+    return _spline(points)
+
+
+def parse_calibration(calibration, axis_name: str):
+    """Turns a config 'calibration' entry (written by calibrate.py) into (center, min, max), or None."""
+    if calibration is None:
+        return None
+    if not isinstance(calibration, dict):
+        raise RuntimeError(f"Invalid calibration for axis {axis_name}: expected center, min and max")
+    center = _number(calibration, 'center', 0.0, axis_name, 'calibration')
+    low = _number(calibration, 'min', -1.0, axis_name, 'calibration')
+    high = _number(calibration, 'max', 1.0, axis_name, 'calibration')
+    if not low < center < high:
+        raise RuntimeError(f"Invalid calibration for axis {axis_name}: need min < center < max")
+    return center, low, high
+
+
+def build_lut(deadzone: float, sensitivity: float, curve: Callable[[float], float] = None,
+              calibration=None) -> array:
+    """Calibration, deadzone, curve, sensitivity and clamp baked into LUT_SIZE + 1 samples over -1..1."""
+    inv = 1.0 / (1.0 - deadzone) if deadzone < 1.0 else 0.0
+    table = array('d', bytes(8 * (LUT_SIZE + 1)))
+    for i in range(LUT_SIZE + 1):
+        x = i / LUT_HALF - 1.0
+        if calibration is not None:
+            # each side of the measured center rescaled to a full -1..1
+            center, low, high = calibration
+            x = (x - center) / (high - center) if x >= center else (x - center) / (center - low)
+            x = 1.0 if x > 1.0 else (-1.0 if x < -1.0 else x)
+        magnitude = abs(x)
+        if magnitude < deadzone:
+            continue
+        v = (magnitude - deadzone) * inv
+        if curve is not None:
+            # shapes the magnitude after the deadzone, mirrored for negative input below
+            v = curve(v)
+        v *= sensitivity
+        v = 1.0 if v > 1.0 else (-1.0 if v < -1.0 else v)
+        table[i] = v if x > 0 else -v
+    return table
+
+
+def lookup(table: array, value: float) -> float:
+    """Linear interpolation into a build_lut() table."""
+    pos = (value + 1.0) * LUT_HALF
+    if pos <= 0.0:
+        return table[0]
+    if pos >= LUT_SIZE:
+        return table[LUT_SIZE]
+    i = int(pos)
+    lo = table[i]
+    return lo + (table[i + 1] - lo) * (pos - i)
+
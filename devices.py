@@ -0,0 +1,263 @@
+import copy
+import json
+import time
+from array import array
+from typing import Dict, List
+
+from backends import PygameEvents
+from input_snapshot import InputSnapshot
+
+# default per-device capacity in the merged snapshot, override with max_axes/max_buttons/max_hats
+DEFAULT_AXES = 8
+DEFAULT_BUTTONS = 32
+DEFAULT_HATS = 4
+
+# enumeration index each device was last found at, tried before a full scan on the next start
+CACHE_PATH = 'device_cache.json'
+
+
+class DeviceSlot:
+    """One configured device and where its inputs live in the merged snapshot."""
+
+    def __init__(self, name: str, spec: Dict, axis_offset: int, button_offset: int, hat_offset: int):
+        self.name = name
+        self.guid = spec.get('guid')
+        self.match_name = spec.get('name')
+        self.index = spec.get('index')
+        if self.guid is None and self.match_name is None and self.index is None:
+            raise RuntimeError(f"Device {name} needs a guid, name or index to be matched by")
+        self.max_axes = int(spec.get('max_axes', DEFAULT_AXES))
+        self.max_buttons = int(spec.get('max_buttons', DEFAULT_BUTTONS))
+        self.max_hats = int(spec.get('max_hats', DEFAULT_HATS))
+        self.axis_offset = axis_offset
+        self.button_offset = button_offset
+        self.hat_offset = hat_offset
+        self.joystick = None  # pygame Joystick while connected
+        self.enum_index = None  # its pygame enumeration index
+        # clamped to capacity when the device connects
+        self.num_axes = self.num_buttons = self.num_hats = 0
+
+    def matches(self, joystick, enum_index: int) -> bool:
+        if self.guid is not None and joystick.get_guid().lower() != str(self.guid).lower():
+            return False
+        if self.match_name is not None and str(self.match_name).lower() not in joystick.get_name().lower():
+            return False
+        if self.index is not None and enum_index != self.index:
+            return False
+        return True
+
+
+class DeviceLayout:
+    """Fixed address space for config['devices']."""
+
+    def __init__(self, devices: Dict[str, Dict]):
+        # each device owns a fixed block whether or not it's plugged in, so the mapping never moves.
+        # the first starts at 0, so bare indices in the config keep referring to it
+        self.slots: List[DeviceSlot] = []
+        axis_offset = button_offset = hat_offset = 0
+        for name, spec in devices.items():
+            slot = DeviceSlot(name, spec, axis_offset, button_offset, hat_offset)
+            self.slots.append(slot)
+            axis_offset += slot.max_axes
+            button_offset += slot.max_buttons
+            hat_offset += slot.max_hats
+        self.by_name = {slot.name: slot for slot in self.slots}
+        self.num_axes = axis_offset
+        self.num_buttons = button_offset
+        self.num_hats = hat_offset
+
+    def resolve(self, address, kind: str, what: str):
+        """["device", index] -> merged index. Bare ints and None pass through."""
+        if not isinstance(address, list):
+            return address
+        if len(address) != 2 or address[0] not in self.by_name or isinstance(address[1], bool) \
+                or not isinstance(address[1], int):
+            raise RuntimeError(f"Invalid device address for {what}: {address!r} "
+                               f"(expected [device name, index], devices: {', '.join(self.by_name)})")
+        slot = self.by_name[address[0]]
+        offset, capacity = {
+            'axis': (slot.axis_offset, slot.max_axes),
+            'button': (slot.button_offset, slot.max_buttons),
+            'hat': (slot.hat_offset, slot.max_hats),
+        }[kind]
+        if not 0 <= address[1] < capacity:
+            raise RuntimeError(f"Invalid device address for {what}: {kind} {address[1]} is outside "
+                               f"{slot.name}'s {capacity} {kind}s")
+        return offset + address[1]
+
+
+def _mappings(bindings, section: str) -> List:
+    # only the well-formed entries, compile_bindings reports the rest
+    entries = bindings.get(section) if isinstance(bindings, dict) else None
+    if not isinstance(entries, dict):
+        return []
+    return [(name, entry) for name, entry in entries.items() if isinstance(entry, dict)]
+
+
+def resolve_addresses(config: Dict, layout: DeviceLayout) -> Dict:
+    """Copy of config with every ["device", index] address replaced by its merged index."""
+    resolved = copy.deepcopy(config)
+
+    mapping = resolved.get('axis_mapping', {})
+    for name, value in mapping.items():
+        if isinstance(value, dict):
+            value['source'] = layout.resolve(value.get('source'), 'axis', name)
+        else:
+            mapping[name] = layout.resolve(value, 'axis', name)
+
+    bindings = resolved.get('bindings', {})
+    for action, binding in _mappings(bindings, 'standard'):
+        binding['button'] = layout.resolve(binding.get('button'), 'button', action)
+    for combo_name, combo in _mappings(bindings, 'combos'):
+        combo['trigger'] = layout.resolve(combo.get('trigger'), 'button', f"combo {combo_name}")
+        for key in ('buttons', 'sequence'):
+            if isinstance(combo.get(key), list):
+                combo[key] = [layout.resolve(b, 'button', f"combo {combo_name}") for b in combo[key]]
+
+    kill_switch = resolved.get('kill_switch', {})
+    if 'button' in kill_switch:
+        kill_switch['button'] = layout.resolve(kill_switch['button'], 'button', 'kill_switch')
+
+    if 'camera_hat' in resolved:
+        resolved['camera_hat'] = layout.resolve(resolved['camera_hat'], 'hat', 'camera_hat')
+    return resolved
+
+
+class MultiDeviceInput(PygameEvents):
+    """Several joysticks read into one merged InputSnapshot with a single pump."""
+
+    def __init__(self, layout: DeviceLayout, cache_path: str = CACHE_PATH, own_pump: bool = True):
+        super().__init__()
+        self.layout = layout
+        self.cache_path = cache_path
+        # False when a scheduler pumps once for several inputs (multiseat.py) before reading them
+        self.own_pump = own_pump
+        self.cache = self.load_cache()
+        self.num_axes = layout.num_axes
+        self.num_buttons = layout.num_buttons
+        self.num_hats = layout.num_hats
+        self.joystick = None
+        self._zero_axes = array('d', bytes(8 * self.num_axes))
+        self._zero_hats = ((0, 0),) * self.num_hats
+        # merge buffers reused by every read(), reset from the zero templates by slice assignment
+        self._axes = array('d', self._zero_axes)
+        self._hats = list(self._zero_hats)
+        self._known_count = -1
+        self._rescan = True
+        self.connected: List[DeviceSlot] = []
+        self.rescan()
+        if not self.connected:
+            print("Warning: none of the configured devices are connected, waiting for them")
+
+    def devices_changed(self):
+        self._rescan = True
+
+    def load_cache(self) -> Dict[str, int]:
+        if self.cache_path is None:
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def save_cache(self, cache: Dict[str, int]):
+        if self.cache_path is None or cache == self.cache:
+            return
+        self.cache = cache
+        try:
+            with open(self.cache_path, 'w') as f:
+                json.dump(cache, f, indent=4)
+        except OSError:
+            pass  # only a startup hint
+
+    def rescan(self):
+        pygame = self.pygame
+        previous = {slot.name for slot in self.connected}
+        for slot in self.layout.slots:
+            slot.joystick = None
+        count = pygame.joystick.get_count()
+        opened = {}  # enumeration index -> Joystick, opening a device is the slow part
+
+        def open_joystick(enum_index):
+            joystick = opened.get(enum_index)
+            if joystick is None:
+                joystick = opened[enum_index] = pygame.joystick.Joystick(enum_index)
+            return joystick
+
+        taken = set()
+
+        def assign(slot, joystick, enum_index):
+            joystick.init()
+            slot.joystick = joystick
+            slot.enum_index = enum_index
+            slot.num_axes = min(joystick.get_numaxes(), slot.max_axes)
+            slot.num_buttons = min(joystick.get_numbuttons(), slot.max_buttons)
+            slot.num_hats = min(joystick.get_numhats(), slot.max_hats)
+            taken.add(enum_index)
+
+        # where each device was last time, usually still right
+        for slot in self.layout.slots:
+            hint = self.cache.get(slot.name)
+            if isinstance(hint, int) and 0 <= hint < count and hint not in taken:
+                joystick = open_joystick(hint)
+                if slot.matches(joystick, hint):
+                    assign(slot, joystick, hint)
+
+        # full scan only for devices that weren't at their cached index
+        if any(slot.joystick is None for slot in self.layout.slots):
+            for enum_index in range(count):
+                if enum_index in taken:
+                    continue
+                joystick = open_joystick(enum_index)
+                for slot in self.layout.slots:
+                    if slot.joystick is None and slot.matches(joystick, enum_index):
+                        assign(slot, joystick, enum_index)
+                        break
+
+        self.save_cache({slot.name: slot.enum_index for slot in self.layout.slots
+                         if slot.joystick is not None})
+        self.connected = [slot for slot in self.layout.slots if slot.joystick is not None]
+        # the first connected device doubles as "the" joystick for single-device tools
+        self.joystick = self.connected[0].joystick if self.connected else None
+        self._known_count = count
+        self._rescan = False
+
+        current = {slot.name for slot in self.connected}
+        for name in sorted(current - previous):
+            print(f"\nDevice '{name}' connected")
+        for name in sorted(previous - current):
+            print(f"\nDevice '{name}' disconnected")
+
+    def read(self) -> InputSnapshot:
+        """One pump, then every connected device copied into its block of the snapshot."""
+        pygame = self.pygame
+        if self.own_pump:
+            pygame.event.pump()
+        if self._rescan or pygame.joystick.get_count() != self._known_count:
+            self.rescan()
+
+        axes = self._axes
+        axes[:] = self._zero_axes
+        buttons = 0
+        hats = self._hats
+        hats[:] = self._zero_hats
+        for slot in self.connected:
+            joystick = slot.joystick
+            try:
+                offset = slot.axis_offset
+                for i in range(slot.num_axes):
+                    axes[offset + i] = joystick.get_axis(i)
+                mask = 0
+                for i in range(slot.num_buttons):
+                    if joystick.get_button(i):
+                        mask |= 1 << i
+                buttons |= mask << slot.button_offset
+                for i in range(slot.num_hats):
+                    hats[slot.hat_offset + i] = joystick.get_hat(i)
+            except pygame.error:
+                # unplugged between the pump and the read, pick it up on the next rescan
+                self._rescan = True
+        # the snapshot gets its own copies, it outlives this read under --threaded and in the display
+        return InputSnapshot(time.perf_counter(), axes[:], buttons, tuple(hats))
@@ -0,0 +1,107 @@
+import math
+from array import array
+from typing import Dict, Sequence, Tuple
+
+FILTER_TYPES = ('none', 'one_euro')
+
+# One Euro defaults: 1 Hz cutoff at rest, no speed adaptation unless beta is set
+DEFAULT_MIN_CUTOFF = 1.0
+DEFAULT_BETA = 0.0
+DEFAULT_D_CUTOFF = 1.0
+
+# an output this close to its input is within one step of the pad's stick range
+SETTLE_EPSILON = 1.0 / 32768
+
+
+def _positive(settings: Dict, key: str, default: float, axis_name: str, allow_zero: bool = False) -> float:
+    value = settings.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 \
+            or (value == 0 and not allow_zero):
+        raise RuntimeError(f"Invalid filter for axis {axis_name}: {key} must be a "
+                           f"{'non-negative' if allow_zero else 'positive'} number")
+    return float(value)
+
+
+def parse_filter(spec, axis_name: str):
+    """Turns a config 'filter' entry (see README) into (min_cutoff, beta, d_cutoff), or None for unfiltered."""
+    if spec is None:
+        return None
+    if not isinstance(spec, dict) or spec.get('type', 'one_euro') not in FILTER_TYPES:
+        raise RuntimeError(f"Invalid filter for axis {axis_name}: type must be one of {', '.join(FILTER_TYPES)}")
+    if spec.get('type') == 'none':
+        return None
+    return (_positive(spec, 'min_cutoff', DEFAULT_MIN_CUTOFF, axis_name),
+            _positive(spec, 'beta', DEFAULT_BETA, axis_name, allow_zero=True),
+            _positive(spec, 'd_cutoff', DEFAULT_D_CUTOFF, axis_name))
+
+
+class OneEuroBank:
+    """One Euro filters for a fixed set of device axes, all state in preallocated arrays."""
+
+    def __init__(self, names: Sequence[str], axis_ids: Sequence[int], params: Sequence[Tuple[float, float, float]]):
+        self.names = list(names)
+        n = len(self.names)
+        # time constants 1 / (2 pi f); with cutoff = min_cutoff + beta * |speed| the
+        # current time constant is tau_min / (1 + beta / min_cutoff * |speed|)
+        self.steps = tuple(
+            (k, axis_id, 1.0 / (2 * math.pi * min_cutoff), beta / min_cutoff, 1.0 / (2 * math.pi * d_cutoff))
+            for k, (axis_id, (min_cutoff, beta, d_cutoff)) in enumerate(zip(axis_ids, params)))
+        self.x = array('d', bytes(8 * n))
+        self.dx = array('d', bytes(8 * n))
+        self.primed = False
+        self.settled = True  # every output within SETTLE_EPSILON of its input after the last run()
+        self.last_time = 0.0
+        self.out = array('d')
+        self.lag = None  # per-filter LatencyHistogram while profiling
+
+    def reset(self):
+        # the next sample restarts the filters instead of easing in from stale values
+        self.primed = False
+
+    def run(self, axes, timestamp: float):
+        # a reused copy of the axes with the filtered ones replaced, clocked by snapshot timestamps
+        out = self.out
+        if len(out) != len(axes):
+            # device size is fixed, this only happens on the first sample
+            self.out = out = array('d', axes)
+        else:
+            out[:] = axes
+        if not self.primed:
+            for k, axis_id, _, _, _ in self.steps:
+                self.x[k] = axes[axis_id]
+                self.dx[k] = 0.0
+            self.primed = True
+            self.settled = True
+            self.last_time = timestamp
+            return out
+
+        te = timestamp - self.last_time
+        x_prev = self.x
+        if te <= 0.0:
+            # repeated sample, hold the last output
+            for k, axis_id, _, _, _ in self.steps:
+                out[axis_id] = x_prev[k]
+            return out
+        self.last_time = timestamp
+        dx_prev = self.dx
+        lag = self.lag
+        settled = True
+        for k, axis_id, tau_min, speed_gain, tau_d in self.steps:
+            x = axes[axis_id]
+            prev = x_prev[k]
+            # smoothed speed, then a cutoff that opens with it
+            a_d = te / (te + tau_d)
+            dx = dx_prev[k] + a_d * ((x - prev) / te - dx_prev[k])
+            dx_prev[k] = dx
+            tau = tau_min / (1.0 + speed_gain * (dx if dx > 0 else -dx))
+            a = te / (te + tau)
+            prev += a * (x - prev)
+            x_prev[k] = prev
+            out[axis_id] = prev
+            if settled and not -SETTLE_EPSILON < x - prev < SETTLE_EPSILON:
+                settled = False
+            if lag is not None:
+                # first-order low pass: delay ~= its time constant at the current cutoff
+                lag[k].record(int(tau * 1e9))
+        self.settled = settled
+        return out
@@ -0,0 +1,28 @@
+from array import array
+from typing import NamedTuple, Tuple
+
+
+class InputSnapshot(NamedTuple):
+    """Device state captured once per tick, everything in the tick reads from this."""
+    timestamp: float
+    axes: array  # by device axis id, raw
+    buttons: int  # bitmask
+    hats: Tuple[Tuple[int, int], ...]
+
+    def pressed(self, button_id) -> bool:
+        if not isinstance(button_id, int) or button_id < 0:
+            return False
+        return bool((self.buttons >> button_id) & 1)
+
+
+def capture(joystick, num_axes: int, num_buttons: int, num_hats: int, timestamp: float) -> InputSnapshot:
+    """Reads a snapshot from anything with pygame's Joystick getters. Doesn't pump."""
+    get_button = joystick.get_button
+    buttons = 0
+    for i in range(num_buttons):
+        if get_button(i):
+            buttons |= 1 << i
+    get_axis = joystick.get_axis
+    axes = array('d', [get_axis(i) for i in range(num_axes)])
+    hats = tuple([joystick.get_hat(i) for i in range(num_hats)])
+    return InputSnapshot(timestamp, axes, buttons, hats)
@@ -1,30 +1,121 @@
-import pygame
 import json
 import math
 import time
 from typing import Dict, Tuple
+from axis_plan import AxisPipeline, compile_axis_plan
+from bindings import compile_bindings
+from rudder import compile_rudder
+from profiles import DEFAULT_PROFILE, ProfileSet, compile_profile_switch, expand_profiles
+from input_snapshot import InputSnapshot
+
+class CompiledMapping:
+    """Everything the loop needs from one config, built together and swapped in as a unit."""
+
+    def __init__(self, config: Dict, resolved: Dict, plan, pipeline, bindings, rudder=(None, None),
+                 name: str = DEFAULT_PROFILE):
+        self.config = config  # the whole file, resolved is this profile's view of it
+        self.resolved = resolved
+        self.name = name
+        self.profiles = None  # ProfileSet shared by every profile of the config, if it has several
+        self.plan = plan
+        self.pipeline = pipeline
+        self.bindings = bindings
+        # binary yaw threshold and PwmRudder (None unless rudder mode is pwm)
+        self.rudder_threshold, self.rudder = rudder
+        self.kill_button = resolved.get('kill_switch', {}).get('button')
+
+    def resume(self, buttons: int):
+        """Clears state left over from the last time this mapping ran, before switching to it."""
+        self.bindings.reset(buttons)
+        self.pipeline.reset()
+        if self.rudder is not None:
+            self.rudder.reset()
 
 class JoystickManager:
-    def __init__(self):
-        pygame.init()
-        pygame.joystick.init()
+    def __init__(self, use_numpy: bool = False, device=None, startup=None, config_path: str = 'config.json',
+                 wrap=None):
+        # startup is an optional profiler.StartupTimer, each step below is marked on it.
+        # wrap, if given, takes the device (default or not) and returns the one to read, e.g. a RecordingInput
+        # load config
+        self.config_path = config_path
+        self.config = self.load_config()
+        self.use_numpy = use_numpy
+        if startup is not None:
+            startup.mark('config')
         
-        # initialize joystick
-        if pygame.joystick.get_count() == 0:
-            raise RuntimeError("No joystick detected")
-            
-        self.joystick = pygame.joystick.Joystick(0)
-        self.joystick.init()
+        # any InputDevice (see backends.py), the physical stick(s) by default
+        self.layout = None
+        if 'devices' in self.config:
+            from devices import DeviceLayout
+            self.layout = DeviceLayout(self.config['devices'])
+        if device is None:
+            if self.layout is not None:
+                from devices import MultiDeviceInput
+                device = MultiDeviceInput(self.layout)
+            else:
+                from backends import PygameInput
+                device = PygameInput()
+        if wrap is not None:
+            device = wrap(device)
+        self.device = device
+        self.joystick = getattr(device, 'joystick', None)  # raw pygame joystick, if there is one
         
-        self.num_buttons = self.joystick.get_numbuttons()
-        self.num_hats = self.joystick.get_numhats()
+        self.num_axes = device.num_axes
+        self.num_buttons = device.num_buttons
+        self.num_hats = device.num_hats
+        self.snapshot = None  # last captured InputSnapshot
+        if startup is not None:
+            startup.mark('joystick')
         
-        # load config
-        self.config = self.load_config()
+        # compile config into a flat plan once, ticks only fill preallocated buffers
+        self.install(self.build(self.config))
+        if startup is not None:
+            startup.mark('compile')
         
+    def build(self, config: Dict) -> CompiledMapping:
+        """Compiles a config without touching the running mapping, safe off the control thread. RuntimeError if invalid."""
+        if config.get('devices') != self.config.get('devices'):
+            raise RuntimeError("the devices section changed, restart to apply it")
+        # every profile is compiled now, so switching later never parses or builds anything
+        mappings = []
+        for name, profile in expand_profiles(config):
+            try:
+                mappings.append(self.build_profile(config, profile, name))
+            except RuntimeError as e:
+                if name == DEFAULT_PROFILE:
+                    raise
+                raise RuntimeError(f"Profile {name}: {e}")
+        if len(mappings) > 1 or 'profile_switch' in config:
+            chords, keys = compile_profile_switch(config.get('profile_switch', {}), [m.name for m in mappings],
+                                                  self.num_buttons, self.layout)
+            profiles = ProfileSet(mappings, chords, keys)
+            for mapping in mappings:
+                mapping.profiles = profiles
+        return mappings[0]
+
+    def build_profile(self, config: Dict, profile: Dict, name: str) -> CompiledMapping:
+        # ["device", index] addresses flattened to indices into the merged snapshot
+        resolved = profile
+        if self.layout is not None:
+            from devices import resolve_addresses
+            resolved = resolve_addresses(profile, self.layout)
+        plan = compile_axis_plan(resolved, self.num_axes)
+        pipeline = AxisPipeline(plan, self.use_numpy)
+        # validated here, a bad mapping is rejected instead of warning every tick
+        bindings = compile_bindings(resolved.get('bindings', {}), self.num_buttons)
+        rudder = compile_rudder(resolved.get('rudder'))
+        return CompiledMapping(config, resolved, plan, pipeline, bindings, rudder, name)
+
+    def install(self, mapping: CompiledMapping):
+        self.mapping = mapping
+        self.config = mapping.config
+        self.resolved = mapping.resolved
+        self.plan = mapping.plan
+        self.pipeline = mapping.pipeline
+
     def load_config(self) -> Dict:
         try:
-            with open('config.json', 'r') as f:
+            with open(self.config_path, 'r') as f:
                 return json.load(f)
         except FileNotFoundError:
             # default if no json
@@ -52,57 +143,41 @@ class JoystickManager:
         normalized = (abs(value) - deadzone) / (1 - deadzone)
         return sign * normalized
         
-    def get_processed_input(self) -> Dict[str, float]:
-        pygame.event.pump()
-        processed = {}
-        raw_axes = {}
-        
-        # hat values
-        if self.num_hats > 0:
-            hat = self.joystick.get_hat(0)
-            raw_axes['hat_x'] = float(hat[0])
-            raw_axes['hat_y'] = float(hat[1])
-        
-        # processing raw values
-        for axis_name, settings in self.config['axes'].items():
-            if axis_name.startswith('hat_'):
-                continue  # HAT AXES ARE PREPROCESSED
-            if isinstance(self.config['axis_mapping'].get(axis_name), int):
-                axis_id = self.config['axis_mapping'][axis_name]
-            elif isinstance(self.config['axis_mapping'].get(axis_name), dict):
-                axis_id = self.config['axis_mapping'][axis_name].get('source', axis_name)
-            else:
-                continue
-                
-            try:
-                raw_value = self.joystick.get_axis(axis_id)
-                value = self.apply_deadzone(raw_value, settings['deadzone'])
-                value = value * settings['sensitivity']
-                value = max(-1.0, min(1.0, value))
-                raw_axes[axis_name] = value
-                processed[axis_name] = value
-            except Exception as e:
-                print(f"Warning: Error processing axis {axis_name}: {e}")
-                
-        # processes mapped controls
-        for control, mapping in self.config['axis_mapping'].items():
-            if isinstance(mapping, dict):
-                source = mapping.get('source', '')
-                if source in raw_axes:
-                    processed[control] = raw_axes[source] * mapping.get('scale', 1.0)
-        
-        return processed
+    def capture(self) -> InputSnapshot:
+        """Pumps the event queue once and reads the whole device into a snapshot."""
+        self.snapshot = self.device.read()
+        return self.snapshot
+
+    def process(self, snapshot: InputSnapshot):
+        """Runs the axis plan over a snapshot into the reused values buffer, index it with plan.slot(name)."""
+        return self.pipeline.run(snapshot)
+
+    def get_processed_input(self):
+        return self.process(self.capture())
+
+    def get_processed_dict(self) -> Dict[str, float]:
+        return self.plan.to_dict(self.get_processed_input())
+
+    def enable_input_events(self):
+        self.device.enable_events()
+
+    def wait_for_input(self, timeout: float) -> bool:
+        """Blocks until the device reports a change or timeout (seconds) passes."""
+        return self.device.wait(timeout)
+
+    def wake(self):
+        self.device.wake()
 
     def is_button_pressed(self, button_id: int) -> bool:
-        pygame.event.pump()
+        # standalone query for scripts, the main loop reads snapshot.pressed() instead
         if button_id is None:
             return False
         if not isinstance(button_id, int):
             return False
         if button_id < 0 or button_id >= self.num_buttons:
             return False
-        return self.joystick.get_button(button_id)
+        return self.capture().pressed(button_id)
 
     def save_config(self):
-        with open('config.json', 'w') as f:
+        with open(self.config_path, 'w') as f:
             json.dump(self.config, f, indent=4)
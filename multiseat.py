@@ -0,0 +1,226 @@
+"""Several seats (stick set -> virtual pad) mapped by one process, see README."""
+import argparse
+import json
+import time
+from typing import Dict
+
+from ace_combat import EVENT_WAIT_TIMEOUT, AceCombatController
+from backends import FakeGamepad, PygameEvents
+from devices import DeviceLayout, MultiDeviceInput
+from profiler import TickProfiler
+from terminal import TerminalRenderer
+
+SEATS_PATH = 'seats.json'
+
+
+class SharedEvents(PygameEvents):
+    """The one event queue every seat's input is read from."""
+
+    def __init__(self):
+        super().__init__()
+        self.inputs = []  # seat MultiDeviceInputs, told when a joystick comes or goes
+
+    def devices_changed(self):
+        for device in self.inputs:
+            device.devices_changed()
+
+
+def load_seats(path: str = SEATS_PATH) -> Dict[str, str]:
+    """Seat name -> config path. Raises RuntimeError if the file is missing or malformed."""
+    try:
+        with open(path, 'r') as f:
+            seats = json.load(f).get('seats')
+    except (OSError, ValueError, AttributeError) as e:
+        raise RuntimeError(f"Can't load seats from {path}: {e}")
+    if not isinstance(seats, dict) or not seats \
+            or not all(isinstance(config, str) for config in seats.values()):
+        raise RuntimeError(f"{path} needs a \"seats\" object mapping seat names to config files")
+    return seats
+
+
+def open_seat_input(name: str, config_path: str) -> MultiDeviceInput:
+    """The seat's devices, read without pumping (the scheduler pumps for everyone)."""
+    try:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RuntimeError(f"Seat {name}: can't load {config_path}: {e}")
+    if 'devices' not in config:
+        raise RuntimeError(f"Seat {name}: {config_path} needs a devices section so seats don't share a stick")
+    return MultiDeviceInput(DeviceLayout(config['devices']), cache_path=f'device_cache.{name}.json',
+                            own_pump=False)
+
+
+def check_exclusive(inputs: Dict[str, MultiDeviceInput]):
+    # a name match like "T.16000M" can pick the same stick for two seats, guids can't
+    owners = {}
+    for seat, device in inputs.items():
+        for slot in device.connected:
+            owner = owners.setdefault(slot.enum_index, seat)
+            if owner != seat:
+                raise RuntimeError(f"Seats {owner} and {seat} both matched joystick {slot.enum_index} "
+                                   f"({slot.joystick.get_name()}), match their devices by guid")
+
+
+class SeatScheduler:
+    """Runs every seat's AceCombatController off one pump and one wait."""
+
+    def __init__(self, controllers: Dict[str, AceCombatController], events=None):
+        self.seats = dict(controllers)
+        self.active = list(self.seats.items())
+        self.events = events  # None for fake inputs that don't need pumping (benchmarks)
+        self.hooked = False
+
+    def hook_keyboard(self):
+        """Every seat's kill and profile keys, one hook per key however many seats share it."""
+        actions = {}
+        for _, controller in self.active:
+            key = controller.manager.config.get('kill_switch', {}).get('key')
+            if key:
+                actions.setdefault(key, []).append((controller.handle_kill_switch, None))
+            if controller.profiles is not None:
+                for key, target in controller.profiles.keys.items():
+                    actions.setdefault(key, []).append((controller.request_profile, target))
+        if not actions:
+            return
+        import keyboard
+        for key, calls in actions.items():
+            keyboard.on_press_key(key, lambda _, calls=tuple(calls): _call_all(calls))
+        self.hooked = True
+
+    def unhook_keyboard(self):
+        if self.hooked:
+            import keyboard
+            keyboard.unhook_all()
+            self.hooked = False
+
+    def round(self) -> bool:
+        """One pump, then one tick per running seat. False once every seat has stopped."""
+        if self.events is not None:
+            self.events.pump()
+        stopped = False
+        for _, controller in self.active:
+            if not controller.tick():
+                stopped = True
+        if stopped:
+            # a seat whose kill button was pressed stops alone, with its pad released
+            for name, controller in self.active:
+                if not controller.running:
+                    print(f"\nSeat {name} stopped")
+                    controller.report.reset()
+                    controller.gamepad.reset()
+                    controller.gamepad.update()
+            self.active = [(name, controller) for name, controller in self.active if controller.running]
+        return bool(self.active)
+
+    def wait_timeout(self, limit: float) -> float:
+        # the soonest combo timer or rudder edge of any seat
+        for _, controller in self.active:
+            limit = controller.wait_timeout(limit)
+        return limit
+
+    def run(self, mode: str, rate: float, poll_interval: float = 0.01):
+        if mode == 'event':
+            self.events.enable_events()
+        period = 1.0 / rate
+        deadline = time.perf_counter()
+        while self.round():
+            if mode == 'event':
+                self.events.wait(self.wait_timeout(EVENT_WAIT_TIMEOUT))
+            elif mode == 'fixed':
+                deadline += period
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+                    continue
+                # the whole round was late, so every seat missed it
+                for _, controller in self.active:
+                    if controller.profiler is not None:
+                        controller.profiler.record_missed_deadline()
+                if remaining < -period:
+                    deadline = time.perf_counter()
+            else:
+                time.sleep(poll_interval)
+
+    def debug_lines(self):
+        lines = []
+        for name, controller in self.seats.items():
+            state = "" if controller.running else " (stopped)"
+            lines.append(f"[{name}]{state}")
+            lines.extend(controller.debug_lines())
+        return lines
+
+
+def _call_all(calls):
+    for call, argument in calls:
+        call(argument)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Map several seats' sticks to their own virtual pads")
+    parser.add_argument('seats', nargs='?', default=SEATS_PATH, help="seats file (default seats.json)")
+    parser.add_argument('--debug', action='store_true', help="show control values for every seat")
+    parser.add_argument('--mode', choices=['event', 'fixed', 'poll'], default='event',
+                        help="event: wake on input from any seat, fixed: steady --rate, poll: 10 ms sleep")
+    parser.add_argument('--rate', type=float, default=250.0, help="rounds per second for --mode fixed")
+    parser.add_argument('--profile', action='store_true', help="print per-seat tick timing on exit")
+    parser.add_argument('--no-telemetry', action='store_true', help="don't publish per-seat shared-memory feeds")
+    parser.add_argument('--numpy', action='store_true', help="use the numpy axis path")
+    parser.add_argument('--no-reload', action='store_true', help="don't watch the seat configs for changes")
+    parser.add_argument('--fake-pad', action='store_true', help="don't create virtual controllers")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    controllers: Dict[str, AceCombatController] = {}
+    display = scheduler = None
+    try:
+        seats = load_seats(args.seats)
+        events = SharedEvents()
+        inputs = {}
+        for name, config_path in seats.items():
+            device = inputs[name] = open_seat_input(name, config_path)
+            events.inputs.append(device)
+        # before any pad exists, so a clash doesn't leave virtual controllers behind
+        check_exclusive(inputs)
+
+        for name, config_path in seats.items():
+            device = inputs[name]
+            gamepad = FakeGamepad() if args.fake_pad else None
+            controller = controllers[name] = AceCombatController(
+                args.numpy, device=device, gamepad=gamepad, hook_keyboard=False, config_path=config_path)
+            if not args.no_reload:
+                controller.watch_config()
+            if args.profile:
+                controller.enable_profiling(TickProfiler())
+            if not args.no_telemetry:
+                from telemetry import DEFAULT_NAME, TelemetryWriter
+                controller.enable_telemetry(TelemetryWriter(device.num_axes, device.num_buttons, device.num_hats,
+                                                            name=f"{DEFAULT_NAME}_{name}"))
+            kill = controller.kill_button
+            print(f"Seat {name}: {config_path}, {len(device.connected)} of {len(device.layout.slots)} "
+                  f"devices connected" + (f", kill switch button {kill}" if kill is not None else ""))
+
+        scheduler = SeatScheduler(controllers, events)
+        scheduler.hook_keyboard()
+        if args.debug:
+            display = TerminalRenderer(scheduler.debug_lines)
+            display.start()
+        scheduler.run(args.mode, args.rate)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+    finally:
+        if display is not None:
+            display.stop()
+        if scheduler is not None:
+            scheduler.unhook_keyboard()
+        for name, controller in controllers.items():
+            controller.cleanup()
+            if controller.profiler is not None:
+                print(f"\n--- Seat {name} ---")
+                print(controller.profiler.format_report())
+
+
+if __name__ == "__main__":
+    main()
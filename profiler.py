@@ -0,0 +1,175 @@
+import json
+import math
+import time
+from array import array
+from typing import Dict
+
+# log-linear buckets like HdrHistogram: 2^SUB_BITS buckets per power of two,
+# so any recorded value is off by at most ~3%
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+MAX_EXPONENT = 40  # values up to ~2^45 ns (about 9 hours) before clamping
+NUM_BUCKETS = (MAX_EXPONENT + 1) * SUB_COUNT
+
+STAGES = ('read', 'buttons', 'axes', 'submit')
+
+
+class LatencyHistogram:
+    """Fixed-size histogram of nanosecond durations, no allocation per record."""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = array('Q', bytes(8 * NUM_BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        if value < SUB_COUNT:
+            index = value
+        else:
+            exponent = value.bit_length() - SUB_BITS
+            index = exponent * SUB_COUNT + (value >> (exponent - 1)) - SUB_COUNT
+            if index >= NUM_BUCKETS:
+                index = NUM_BUCKETS - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def bucket_value(index: int) -> int:
+        """Upper edge of a bucket, so percentiles never under-report."""
+        if index < SUB_COUNT:
+            return index
+        exponent = index // SUB_COUNT
+        width = 1 << (exponent - 1)
+        return ((index % SUB_COUNT + SUB_COUNT) << (exponent - 1)) + width - 1
+
+    def percentile(self, pct: float) -> int:
+        if self.count == 0:
+            return 0
+        target = max(1, math.ceil(self.count * pct / 100.0))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= target:
+                    return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'mean_ns': round(self.mean()),
+            'p50_ns': self.percentile(50),
+            'p99_ns': self.percentile(99),
+            'max_ns': self.max,
+        }
+
+
+class TickProfiler:
+    """Per-stage latency, tick interval and missed deadlines for the main loop."""
+
+    def __init__(self):
+        self.stages = {name: LatencyHistogram() for name in STAGES}
+        self.tick = LatencyHistogram()
+        self.interval = LatencyHistogram()
+        # for interval jitter (std dev), in ns and ns^2
+        self._interval_sum = 0
+        self._interval_sq_sum = 0
+        self._last_start = None
+        self.missed_deadlines = 0
+        self.filters = {}  # axis name -> lag added by its input filter
+
+    def record_tick(self, start: int, read: int, buttons: int, axes: int, submit: int):
+        """Timestamps (perf_counter_ns) taken at the start and after each stage."""
+        stages = self.stages
+        stages['read'].record(read - start)
+        stages['buttons'].record(buttons - read)
+        stages['axes'].record(axes - buttons)
+        stages['submit'].record(submit - axes)
+        self.tick.record(submit - start)
+
+        if self._last_start is not None:
+            interval = start - self._last_start
+            self.interval.record(interval)
+            self._interval_sum += interval
+            self._interval_sq_sum += interval * interval
+        self._last_start = start
+
+    def filter_lag(self, axis_name: str) -> LatencyHistogram:
+        """Lag histogram for one axis filter, kept across config reloads."""
+        hist = self.filters.get(axis_name)
+        if hist is None:
+            hist = self.filters[axis_name] = LatencyHistogram()
+        return hist
+
+    def record_missed_deadline(self):
+        self.missed_deadlines += 1
+
+    def jitter_ns(self) -> float:
+        n = self.interval.count
+        if n < 2:
+            return 0.0
+        mean = self._interval_sum / n
+        return math.sqrt(max(0.0, self._interval_sq_sum / n - mean * mean))
+
+    def summary(self) -> Dict:
+        return {
+            'stages': {name: hist.summary() for name, hist in self.stages.items()},
+            'tick': self.tick.summary(),
+            'interval': dict(self.interval.summary(), jitter_ns=round(self.jitter_ns())),
+            'missed_deadlines': self.missed_deadlines,
+            'filter_lag': {name: hist.summary() for name, hist in self.filters.items()},
+        }
+
+    def format_report(self) -> str:
+        def us(ns):
+            return f"{ns / 1000:>9.1f}"
+
+        lines = ["", "=== Tick Profile (us) ===",
+                 f"{'stage':>10} {'count':>9} {'p50':>9} {'p99':>9} {'max':>9}"]
+        rows = list(self.stages.items()) + [('tick', self.tick), ('interval', self.interval)]
+        for name, hist in rows:
+            lines.append(f"{name:>10} {hist.count:>9} {us(hist.percentile(50))} "
+                         f"{us(hist.percentile(99))} {us(hist.max)}")
+        for name, hist in self.filters.items():
+            lines.append(f"{'lag ' + name:>10} {hist.count:>9} {us(hist.percentile(50))} "
+                         f"{us(hist.percentile(99))} {us(hist.max)}")
+        lines.append(f"Interval jitter (std dev): {self.jitter_ns() / 1000:.1f} us")
+        lines.append(f"Missed deadlines: {self.missed_deadlines}")
+        return "\n".join(lines)
+
+    def dump_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=4)
+
+
+class StartupTimer:
+    """Wall time of each startup step, printed once the first report is out."""
+
+    def __init__(self, start: float = None):
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.steps = []
+
+    def mark(self, name: str):
+        """Ends the step called name."""
+        now = time.perf_counter()
+        self.steps.append((name, now - self.last))
+        self.last = now
+
+    def total(self) -> float:
+        return self.last - self.start
+
+    def format_report(self) -> str:
+        steps = ", ".join(f"{name} {seconds * 1000:.1f}" for name, seconds in self.steps)
+        return f"Started in {self.total() * 1000:.0f} ms ({steps})"
@@ -0,0 +1,135 @@
+from typing import Dict, List, Tuple
+
+# the top-level config is this profile, entries under "profiles" override its sections
+DEFAULT_PROFILE = 'default'
+PROFILE_SECTIONS = ('axes', 'axis_mapping', 'bindings', 'controls', 'rudder', 'camera_hat')
+
+# switch target meaning "the profile after the current one", other targets are profile names
+CYCLE = -1
+
+
+def expand_profiles(config: Dict) -> List[Tuple[str, Dict]]:
+    """[(name, full config)] for the default profile and each of config['profiles'], RuntimeError if malformed."""
+    profiles = config.get('profiles', {})
+    if not isinstance(profiles, dict):
+        raise RuntimeError("Invalid profiles: expected an object of profile name -> sections")
+    base = {key: value for key, value in config.items() if key not in ('profiles', 'profile_switch')}
+    expanded = [(DEFAULT_PROFILE, base)]
+    for name, sections in profiles.items():
+        if name == DEFAULT_PROFILE:
+            raise RuntimeError(f"Invalid profile {name}: the top-level config is the {DEFAULT_PROFILE} profile")
+        if not isinstance(sections, dict):
+            raise RuntimeError(f"Invalid profile {name}: expected an object of config sections")
+        unknown = [key for key in sections if key not in PROFILE_SECTIONS]
+        if unknown:
+            raise RuntimeError(f"Invalid profile {name}: {', '.join(unknown)} can't be set per profile "
+                               f"(allowed: {', '.join(PROFILE_SECTIONS)})")
+        merged = dict(base)
+        merged.update(sections)
+        expanded.append((name, merged))
+    return expanded
+
+
+def _trigger(spec, what: str, num_buttons: int, layout=None):
+    """(chord button mask or 0, key or None) from {"chord": [...], "key": "..."}."""
+    if not isinstance(spec, dict):
+        raise RuntimeError(f"Invalid profile switch for {what}: expected {{\"chord\": [buttons], \"key\": name}}")
+    mask = 0
+    chord = spec.get('chord')
+    if chord is not None:
+        if not isinstance(chord, list) or not chord:
+            raise RuntimeError(f"Invalid profile switch for {what}: chord must be a list of buttons")
+        for button in chord:
+            if layout is not None:
+                button = layout.resolve(button, 'button', f"profile switch {what}")
+            if isinstance(button, bool) or not isinstance(button, int) or not 0 <= button < num_buttons:
+                raise RuntimeError(f"Invalid profile switch for {what}: button {button!r} does not exist "
+                                   f"(device has {num_buttons})")
+            mask |= 1 << button
+    key = spec.get('key')
+    if key is not None and not isinstance(key, str):
+        raise RuntimeError(f"Invalid profile switch for {what}: key must be a key name")
+    return mask, key
+
+
+class ProfileSet:
+    """Every profile of a config, compiled up front so a switch is a list lookup."""
+
+    def __init__(self, mappings: List, chords: List[Tuple[int, object]], keys: Dict[str, object]):
+        self.mappings = mappings
+        self.names = [mapping.name for mapping in mappings]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.chords = tuple(chords)  # (button mask, profile name or CYCLE)
+        self.keys = keys  # key name -> profile name or CYCLE
+        self.watch_mask = 0
+        for mask, _ in self.chords:
+            self.watch_mask |= mask
+        self.last_buttons = 0
+        self.held = 0  # chord that last fired, until all of its buttons are released
+        self.suppressed = 0  # watch_mask while held, masked out of what the bindings see
+
+    def poll(self, buttons: int):
+        """Switch target of a chord completed by this button mask, or None."""
+        held = self.held
+        if held and not buttons & held:
+            self.held = self.suppressed = 0
+        # a chord fires when its last button goes down while the rest are held
+        watched = buttons & self.watch_mask
+        pressed = watched & ~self.last_buttons
+        self.last_buttons = watched
+        if not pressed:
+            return None
+        for mask, target in self.chords:
+            if pressed & mask and watched & mask == mask:
+                self.held = mask
+                self.suppressed = self.watch_mask
+                return target
+        return None
+
+    def resume(self, buttons: int, held: int = 0):
+        """Takes over from the set a config reload replaced, held is its chord still down, if any."""
+        self.last_buttons = buttons & self.watch_mask
+        self.held = self.suppressed = 0
+        if held and buttons & held:
+            self.held = held
+            self.suppressed = self.watch_mask
+
+    def target(self, target, current: int):
+        """Profile index a switch target resolves to from the current one, None if it's gone."""
+        if target == CYCLE:
+            return (current + 1) % len(self.mappings)
+        return self.index.get(target)
+
+
+def compile_profile_switch(settings: Dict, names: List[str], num_buttons: int, layout=None):
+    """(chords, keys) from config['profile_switch'], see README. Raises RuntimeError on invalid settings."""
+    if not isinstance(settings, dict):
+        raise RuntimeError("Invalid profile_switch: expected an object")
+    targets = []
+    if 'cycle' in settings:
+        targets.append(('cycle', CYCLE, settings['cycle']))
+    select = settings.get('select', {})
+    if not isinstance(select, dict):
+        raise RuntimeError("Invalid profile_switch: select must map profile names to chords/keys")
+    for name, spec in select.items():
+        if name not in names:
+            raise RuntimeError(f"Invalid profile switch for {name}: no such profile "
+                               f"(profiles: {', '.join(names)})")
+        targets.append((name, name, spec))
+
+    chords = []
+    keys = {}
+    for what, target, spec in targets:
+        mask, key = _trigger(spec, what, num_buttons, layout)
+        if mask:
+            for other, _ in chords:
+                if other == mask:
+                    raise RuntimeError(f"Invalid profile switch for {what}: chord is already used")
+            chords.append((mask, target))
+        if key is not None:
+            if key in keys:
+                raise RuntimeError(f"Invalid profile switch for {what}: key {key!r} is already used")
+            keys[key] = target
+    # a chord that contains another must be checked first, or the smaller one always wins
+    chords.sort(key=lambda chord: -bin(chord[0]).count('1'))
+    return chords, keys
@@ -0,0 +1,214 @@
+import mmap
+import struct
+import time
+from array import array
+from typing import List
+
+from input_snapshot import InputSnapshot
+
+# file layout: header, then fixed-width little-endian records back to back
+#   header: magic, version, num_axes, num_buttons, num_hats
+#   record: time since recording start (ns, int64), axes (float32 each),
+#           button mask ((num_buttons + 7) // 8 bytes, 8 in version 1), hats (int8 x, int8 y each)
+MAGIC = b'AC7R'
+VERSION = 2
+HEADER = struct.Struct('<4sHHHH')
+
+# records are packed into this many-record chunk before each file write
+FLUSH_RECORDS = 1024
+
+
+def mask_bytes(num_buttons: int, version: int = VERSION) -> int:
+    # version 1 always stored a uint64, the same bytes as an 8 byte little-endian mask
+    return 8 if version == 1 else (num_buttons + 7) // 8
+
+
+def record_struct(num_axes: int, mask_size: int, num_hats: int) -> struct.Struct:
+    return struct.Struct(f'<q{num_axes}f{mask_size}s{num_hats * 2}b')
+
+
+class RecordingWriter:
+    """Append-only recorder, packs into a preallocated buffer and writes it out in chunks."""
+
+    def __init__(self, path: str, num_axes: int, num_buttons: int, num_hats: int):
+        self.num_axes = num_axes
+        self.num_hats = num_hats
+        self.mask_size = mask_bytes(num_buttons)
+        self.button_mask = (1 << num_buttons) - 1
+        self.record = record_struct(num_axes, self.mask_size, num_hats)
+        self.buffer = bytearray(self.record.size * FLUSH_RECORDS)
+        self.pending = 0
+        self.count = 0
+        self.start = None
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, num_axes, num_buttons, num_hats))
+
+    def append(self, snapshot: InputSnapshot):
+        if self.start is None:
+            self.start = snapshot.timestamp
+        hats = []
+        for hat in snapshot.hats[:self.num_hats]:
+            hats.extend(hat)
+        self.record.pack_into(self.buffer, self.pending * self.record.size,
+                              int((snapshot.timestamp - self.start) * 1e9),
+                              *snapshot.axes[:self.num_axes],
+                              (snapshot.buttons & self.button_mask).to_bytes(self.mask_size, 'little'), *hats)
+        self.pending += 1
+        self.count += 1
+        if self.pending == FLUSH_RECORDS:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self.file.write(memoryview(self.buffer)[:self.pending * self.record.size])
+            self.pending = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class RecordingInput:
+    """Wraps an InputDevice and records every sample it reads."""
+
+    def __init__(self, device, path: str):
+        self.device = device
+        self.joystick = getattr(device, 'joystick', None)
+        self.num_axes = device.num_axes
+        self.num_buttons = device.num_buttons
+        self.num_hats = device.num_hats
+        self.writer = RecordingWriter(path, self.num_axes, self.num_buttons, self.num_hats)
+
+    def read(self) -> InputSnapshot:
+        snapshot = self.device.read()
+        self.writer.append(snapshot)
+        return snapshot
+
+    def enable_events(self):
+        self.device.enable_events()
+
+    def wait(self, timeout: float) -> bool:
+        return self.device.wait(timeout)
+
+    def wake(self):
+        self.device.wake()
+
+    def close(self):
+        self.writer.close()
+        close = getattr(self.device, 'close', None)
+        if close is not None:
+            close()
+
+
+class Recording:
+    """Memory-mapped, read-only view of a recording file."""
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < HEADER.size:
+            raise RuntimeError(f"{path} is not an input recording")
+        magic, version, self.num_axes, self.num_buttons, self.num_hats = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise RuntimeError(f"{path} is not an input recording")
+        if version not in (1, VERSION):
+            raise RuntimeError(f"{path} is recording version {version}, expected {VERSION}")
+        self.record = record_struct(self.num_axes, mask_bytes(self.num_buttons, version), self.num_hats)
+        # a partly written last record (e.g. after a crash) is ignored
+        self.count = (len(self.map) - HEADER.size) // self.record.size
+
+    def __len__(self):
+        return self.count
+
+    def time_at(self, index: int) -> float:
+        """Seconds since the start of the recording."""
+        return struct.unpack_from('<q', self.map, HEADER.size + index * self.record.size)[0] / 1e9
+
+    def sample(self, index: int, timestamp: float = None) -> InputSnapshot:
+        fields = self.record.unpack_from(self.map, HEADER.size + index * self.record.size)
+        n = self.num_axes
+        axes = array('d', fields[1:1 + n])
+        buttons = int.from_bytes(fields[1 + n], 'little')
+        hat_values = fields[2 + n:]
+        hats = tuple([(hat_values[i], hat_values[i + 1]) for i in range(0, len(hat_values), 2)])
+        if timestamp is None:
+            timestamp = fields[0] / 1e9
+        return InputSnapshot(timestamp, axes, buttons, hats)
+
+    def samples(self, limit: int = None) -> List:
+        """(axes, buttons, hats) tuples for FakeInput, loaded into memory."""
+        count = self.count if limit is None else min(limit, self.count)
+        result = []
+        for i in range(count):
+            snapshot = self.sample(i)
+            result.append((list(snapshot.axes), snapshot.buttons, snapshot.hats))
+        return result
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+class ReplayInput:
+    """InputDevice that plays a recording back through JoystickManager."""
+
+    def __init__(self, path: str, realtime: bool = True, on_end=None):
+        self.recording = Recording(path)
+        self.num_axes = self.recording.num_axes
+        self.num_buttons = self.recording.num_buttons
+        self.num_hats = self.recording.num_hats
+        # realtime follows the recorded timing, otherwise every read() is the next sample.
+        # timestamps follow the recorded spacing either way
+        self.realtime = realtime
+        self.on_end = on_end  # called once, after the last sample
+        self.current = -1  # index of the last sample handed out
+        self.exhausted = False
+        self.origin = None
+        if len(self.recording) == 0:
+            raise RuntimeError(f"{path} contains no samples")
+
+    def read(self) -> InputSnapshot:
+        recording = self.recording
+        last = len(recording) - 1
+        if self.origin is None:
+            self.origin = time.perf_counter()
+        if self.realtime:
+            # newest sample that is due, skipping any we were too slow to show
+            index = self.current
+            elapsed = time.perf_counter() - self.origin
+            while index < last and recording.time_at(index + 1) <= elapsed:
+                index += 1
+            index = max(index, 0)
+        else:
+            index = min(self.current + 1, last)
+        self.current = index
+        snapshot = recording.sample(index, self.origin + recording.time_at(index))
+        if index == last and not self.exhausted:
+            self.exhausted = True
+            if self.on_end is not None:
+                self.on_end()
+        return snapshot
+
+    def enable_events(self):
+        pass
+
+    def wait(self, timeout: float) -> bool:
+        if self.exhausted:
+            time.sleep(timeout)
+            return False
+        if self.realtime and self.origin is not None:
+            delay = self.origin + self.recording.time_at(self.current + 1) - time.perf_counter()
+            if delay > timeout:
+                time.sleep(timeout)
+                return False
+            if delay > 0:
+                time.sleep(delay)
+        return True
+
+    def wake(self):
+        pass
+
+    def close(self):
+        self.recording.close()
@@ -0,0 +1,109 @@
+from typing import Dict
+
+from bindings import XUSB_BUTTONS
+
+LEFT_SHOULDER = XUSB_BUTTONS['XUSB_GAMEPAD_LEFT_SHOULDER']
+RIGHT_SHOULDER = XUSB_BUTTONS['XUSB_GAMEPAD_RIGHT_SHOULDER']
+
+RUDDER_MODES = ('binary', 'pwm')
+
+# defaults for config['rudder']
+DEFAULT_THRESHOLD = 0.3     # binary: press past this much yaw
+DEFAULT_FREQUENCY = 8.0     # pwm: pulses per second
+DEFAULT_DEADBAND = 0.15     # pwm: yaw needed to start pulsing
+DEFAULT_HYSTERESIS = 0.05   # pwm: stops only once yaw drops this far below the deadband
+DEFAULT_FULL = 0.9          # pwm: yaw at which the button is held solid
+DEFAULT_MIN_PULSE_MS = 20   # pwm: shortest press/gap, about one game frame
+
+# an edge this close counts as reached, so a tick landing on it doesn't reschedule it
+EDGE_SLACK = 1e-4
+
+
+class PwmRudder:
+    """Proportional rudder on the binary LB/RB buttons by pulse-width modulation."""
+
+    __slots__ = ('period', 'engage', 'release', 'full', 'min_duty', 'max_duty',
+                 'engaged', 'epoch', 'next_edge')
+
+    def __init__(self, frequency: float = DEFAULT_FREQUENCY, deadband: float = DEFAULT_DEADBAND,
+                 hysteresis: float = DEFAULT_HYSTERESIS, full: float = DEFAULT_FULL,
+                 min_pulse_ms: float = DEFAULT_MIN_PULSE_MS):
+        self.period = 1.0 / frequency
+        self.engage = deadband
+        self.release = max(deadband - hysteresis, 0.0)
+        self.full = full
+        # pulses or gaps shorter than min_pulse_ms would be missed by the game
+        self.min_duty = min(min_pulse_ms / 1000 / self.period, 0.5)
+        self.max_duty = 1.0 - self.min_duty
+        self.engaged = False
+        self.epoch = 0.0
+        self.next_edge = None
+
+    def reset(self):
+        self.engaged = False
+        self.next_edge = None
+
+    def update(self, yaw: float, now: float) -> int:
+        """XUSB shoulder bit to hold at time now (seconds), 0 for neither."""
+        magnitude = yaw if yaw > 0 else -yaw
+        if self.engaged:
+            if magnitude < self.release:
+                self.engaged = False
+        elif magnitude >= self.engage:
+            self.engaged = True
+            self.epoch = now  # start a fresh period so the first pulse goes out right away
+        if not self.engaged:
+            self.next_edge = None
+            return 0
+
+        button = RIGHT_SHOULDER if yaw > 0 else LEFT_SHOULDER
+        if magnitude >= self.full:
+            self.next_edge = None
+            return button
+        duty = (magnitude - self.release) / (self.full - self.release)
+        if duty < self.min_duty:
+            duty = self.min_duty
+        elif duty > self.max_duty:
+            self.next_edge = None
+            return button
+
+        # a function of time alone, so pulse widths don't depend on the tick rate
+        # as long as a tick lands on each edge: next_edge is when it next flips
+        period = self.period
+        phase = (now - self.epoch) % period
+        if period - phase < EDGE_SLACK:
+            phase = 0.0
+        on_time = duty * period
+        if phase < on_time - EDGE_SLACK:
+            self.next_edge = now + on_time - phase
+            return button
+        self.next_edge = now + period - phase
+        return 0
+
+
+def _number(settings: Dict, key: str, default: float, low: float, high: float = None) -> float:
+    value = settings.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < low \
+            or (high is not None and value > high):
+        limit = f"between {low} and {high}" if high is not None else f"at least {low}"
+        raise RuntimeError(f"Invalid rudder setting: {key} must be a number {limit}")
+    return float(value)
+
+
+def compile_rudder(settings: Dict):
+    """(binary threshold, PwmRudder or None) from config['rudder'], raises RuntimeError on invalid settings."""
+    settings = settings or {}
+    if not isinstance(settings, dict) or settings.get('mode', 'binary') not in RUDDER_MODES:
+        raise RuntimeError(f"Invalid rudder setting: mode must be one of {', '.join(RUDDER_MODES)}")
+    threshold = _number(settings, 'threshold', DEFAULT_THRESHOLD, 0.0, 1.0)
+    if settings.get('mode', 'binary') == 'binary':
+        return threshold, None
+
+    frequency = _number(settings, 'frequency', DEFAULT_FREQUENCY, 0.5, 60.0)
+    deadband = _number(settings, 'deadband', DEFAULT_DEADBAND, 0.0, 1.0)
+    hysteresis = _number(settings, 'hysteresis', DEFAULT_HYSTERESIS, 0.0, 1.0)
+    full = _number(settings, 'full', DEFAULT_FULL, 0.0, 1.0)
+    min_pulse_ms = _number(settings, 'min_pulse_ms', DEFAULT_MIN_PULSE_MS, 0.0)
+    if full <= deadband:
+        raise RuntimeError("Invalid rudder setting: full must be above deadband")
+    return threshold, PwmRudder(frequency, deadband, hysteresis, full, min_pulse_ms)
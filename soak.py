@@ -0,0 +1,268 @@
+"""Long-running, hardware-free soak test of the full controller, see README."""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from benchmark import build_controller, load_config_shape
+from backends import synthetic_trace
+from profiler import LatencyHistogram
+
+DEFAULT_DURATION = 600.0
+DEFAULT_INTERVAL = 10.0
+DEFAULT_RATE = 250.0
+TOP_ALLOCATORS = 3
+TELEMETRY_NAME = 'ac7sm_soak'
+
+
+def rss_bytes():
+    """Resident set size of this process, or None where it can't be read."""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                    'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage',
+                    'PagefileUsage', 'PeakPagefileUsage')]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize
+        return None
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def memory_snapshot():
+    # the harness's own bookkeeping isn't what's being measured
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ))
+
+
+def memory_stats(baseline, limit: int = TOP_ALLOCATORS):
+    """(traced bytes, the allocation sites that grew most since the baseline snapshot as one string)."""
+    snapshot = memory_snapshot()
+    traced = sum(stat.size for stat in snapshot.statistics('filename'))
+    growth = []
+    for stat in snapshot.compare_to(baseline, 'lineno')[:limit]:
+        if stat.size_diff <= 0:
+            break
+        frame = stat.traceback[0]
+        growth.append(f"{os.path.basename(frame.filename)}:{frame.lineno} "
+                      f"+{stat.size_diff / 1024:.1f}KB/{stat.count_diff:+d}")
+    return traced, ", ".join(growth)
+
+
+def slope_per_hour(points, key: str):
+    """Least-squares growth of points[key] per hour, None with fewer than two points."""
+    pairs = [(p['t'], p[key]) for p in points if p.get(key) is not None]
+    if len(pairs) < 2:
+        return None
+    n = len(pairs)
+    mean_t = sum(t for t, _ in pairs) / n
+    mean_v = sum(v for _, v in pairs) / n
+    var = sum((t - mean_t) ** 2 for t, _ in pairs)
+    if var == 0:
+        return None
+    cov = sum((t - mean_t) * (v - mean_v) for t, v in pairs)
+    return round(cov / var * 3600, 3)
+
+
+def run_soak(duration: float = DEFAULT_DURATION, interval: float = DEFAULT_INTERVAL,
+             rate: float = DEFAULT_RATE, use_numpy: bool = False, trace_memory: bool = True,
+             telemetry: bool = True, display: bool = False, on_sample=None) -> dict:
+    kill_button, device_size = load_config_shape()
+    exclude = (1 << kill_button) if isinstance(kill_button, int) else 0
+    samples = synthetic_trace(10000, *device_size, exclude_mask=exclude)
+    controller, device, pad = build_controller(samples, use_numpy, *device_size)
+    if telemetry:
+        from telemetry import TelemetryWriter
+        controller.enable_telemetry(TelemetryWriter(device.num_axes, device.num_buttons, device.num_hats,
+                                                     name=TELEMETRY_NAME))
+
+    gc.collect()
+    baseline = None
+    if trace_memory:
+        tracemalloc.start()
+        baseline = memory_snapshot()
+
+    clock = time.perf_counter
+    clock_ns = time.perf_counter_ns
+    tick = controller.tick
+    period = 1.0 / rate if rate else 0.0
+    # the display thread would call debug_lines() about this often, measured in ticks
+    display_every = max(int(rate / 30), 1) if rate else 1000
+
+    points = []
+    hist = LatencyHistogram()
+    ticks = total_ticks = 0
+    calls, updates = pad.calls, pad.updates
+    start = last = clock()
+    deadline = start
+    next_sample = start + interval
+    try:
+        while True:
+            before = clock_ns()
+            tick()
+            hist.record(clock_ns() - before)
+            ticks += 1
+            if display and ticks % display_every == 0:
+                controller.debug_lines()
+            if period:
+                deadline += period
+                remaining = deadline - clock()
+                if remaining > 0:
+                    time.sleep(remaining)
+            now = clock()
+            if now < next_sample:
+                continue
+
+            # before this sample is built. points hold only numbers and strings, which CPython
+            # doesn't track, so earlier samples aren't counted either
+            objects = len(gc.get_objects())
+            elapsed = now - last
+            total_ticks += ticks
+            point = {
+                't': round(now - start, 1),
+                'ticks_per_sec': round(ticks / elapsed, 1),
+                'tick_p50_us': round(hist.percentile(50) / 1000, 2),
+                'tick_p99_us': round(hist.percentile(99) / 1000, 2),
+                'tick_max_us': round(hist.max / 1000, 2),
+                # paced runs only: how far the loop has fallen behind its schedule
+                'behind_ms': round(max(now - deadline, 0.0) * 1000, 2) if period else None,
+                'driver_calls_per_sec': round((pad.calls - calls) / elapsed, 1),
+                'driver_updates_per_sec': round((pad.updates - updates) / elapsed, 1),
+                'rss_mb': None,
+                'gc_objects': objects,
+            }
+            rss = rss_bytes()
+            if rss is not None:
+                point['rss_mb'] = round(rss / 2 ** 20, 2)
+            if trace_memory:
+                traced, growth = memory_stats(baseline)
+                point['traced_kb'] = round(traced / 1024, 1)
+                point['top_growth'] = growth
+            points.append(point)
+            if on_sample is not None:
+                on_sample(point)
+
+            hist = LatencyHistogram()
+            ticks = 0
+            calls, updates = pad.calls, pad.updates
+            # sampling (tracemalloc snapshots especially) is slow, keep it out of the next interval
+            last = clock()
+            deadline += last - now
+            next_sample = last + interval
+            if now - start >= duration:
+                break
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        controller.cleanup()
+
+    # the first interval includes warm-up, growth is fitted from the second one on
+    steady = points[1:] if len(points) > 2 else points
+    rates = [p['ticks_per_sec'] for p in steady]
+    summary = {
+        'ticks': total_ticks,
+        'ticks_per_sec_first': rates[0] if rates else None,
+        'ticks_per_sec_last': rates[-1] if rates else None,
+        'tick_rate_drift_per_hour': slope_per_hour(steady, 'ticks_per_sec'),
+        'tick_p99_us_per_hour': slope_per_hour(steady, 'tick_p99_us'),
+        'max_behind_ms': max((p['behind_ms'] for p in points if p['behind_ms'] is not None), default=None),
+        'driver_calls_per_sec': round(sum(p['driver_calls_per_sec'] for p in steady) / len(steady), 1)
+        if steady else None,
+        'rss_mb_per_hour': slope_per_hour(steady, 'rss_mb'),
+        'traced_kb_per_hour': slope_per_hour(steady, 'traced_kb') if trace_memory else None,
+        'gc_objects_per_hour': slope_per_hour(steady, 'gc_objects'),
+    }
+    return {
+        'duration': duration,
+        'interval': interval,
+        'rate': rate,
+        'numpy': use_numpy,
+        'tracemalloc': trace_memory,
+        'telemetry': telemetry,
+        'display': display,
+        'summary': summary,
+        'points': points,
+    }
+
+
+def format_point(point: dict) -> str:
+    behind = f"{point['behind_ms']:>8.2f}" if point['behind_ms'] is not None else f"{'-':>8}"
+    rss = f"{point['rss_mb']:>8.2f}" if point['rss_mb'] is not None else f"{'-':>8}"
+    traced = f"{point['traced_kb']:>9.1f}" if 'traced_kb' in point else f"{'-':>9}"
+    line = (f"{point['t']:>7.1f} {point['ticks_per_sec']:>10.1f} {point['tick_p50_us']:>8.2f} "
+            f"{point['tick_p99_us']:>8.2f} {behind} {point['driver_calls_per_sec']:>10.1f} {rss} {traced} "
+            f"{point['gc_objects']:>8}")
+    growth = point.get('top_growth')
+    if growth:
+        line += "  " + growth
+    return line
+
+
+HEADER_LINE = (f"{'t s':>7} {'ticks/s':>10} {'p50 us':>8} {'p99 us':>8} {'behind':>8} "
+               f"{'calls/s':>10} {'rss MB':>8} {'traced KB':>9} {'objects':>8}  top growth")
+
+
+def format_summary(summary: dict, previous: dict = None) -> str:
+    lines = ["", "=== Soak Summary ==="]
+    for key, value in summary.items():
+        line = f"{key:>28}: {value if value is not None else '-'}"
+        if previous is not None and key in previous:
+            line += f"   (was {previous[key] if previous[key] is not None else '-'})"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Soak test the controller without hardware")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="seconds to run (default 600)")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="seconds between samples (default 10)")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE,
+                        help="ticks per second like --mode fixed, 0 runs flat out (default 250)")
+    parser.add_argument('--numpy', action='store_true', help="use the numpy axis path")
+    parser.add_argument('--no-tracemalloc', action='store_true',
+                        help="skip allocation tracing, it slows every tick down")
+    parser.add_argument('--no-telemetry', action='store_true', help="don't publish to shared memory")
+    parser.add_argument('--display', action='store_true',
+                        help="also build the --debug display lines at 30 Hz")
+    parser.add_argument('--json', metavar='FILE', help="write the time series and summary to FILE")
+    parser.add_argument('--compare', metavar='FILE', help="show a previous --json run's summary alongside")
+    args = parser.parse_args(argv)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            previous = json.load(f)['summary']
+
+    print(f"Soaking for {args.duration:.0f} s at {args.rate or 'max'} ticks/s, "
+          f"sampling every {args.interval:.0f} s")
+    print(HEADER_LINE)
+    results = run_soak(args.duration, args.interval, args.rate, args.numpy, not args.no_tracemalloc,
+                       not args.no_telemetry, args.display,
+                       on_sample=lambda point: print(format_point(point), flush=True))
+    print(format_summary(results['summary'], previous))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
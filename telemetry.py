@@ -0,0 +1,275 @@
+"""Shared-memory ring buffer of what the mapper did on every tick, for test_inputs.py and other tools."""
+import json
+import os
+import struct
+import sys
+from multiprocessing import shared_memory
+from typing import Dict, List, NamedTuple, Tuple
+
+DEFAULT_NAME = 'ac7sm_telemetry'
+MAGIC = b'AC7T'
+VERSION = 3
+DEFAULT_SLOTS = 256
+MAX_VALUES = 32  # processed value slots per record, extra outputs aren't published
+META_SIZE = 4096
+
+# block layout, little-endian:
+#   header: magic, version, slots, record size, axes, hats, max values, buttons,
+#           latest sequence, meta sequence, meta length, writer pid
+#   meta:   JSON {"values": [...], "combos": [...]}, rewritten on config reload
+#   slots:  record n in slot n % slots: seq, timestamp, combos, button bytes, axes,
+#           values, hats, XUSB report, seq again
+HEADER = struct.Struct('<4sHHIHHHHQQII')
+RECORD_HEAD = struct.Struct('<QdQ')
+REPORT = struct.Struct('<HhhhhBBxxxx')
+SEQ = struct.Struct('<Q')
+HAT = struct.Struct('<bb')
+
+# header field offsets the hot path writes / readers poll
+SEQUENCE_OFFSET = 20
+META_SEQUENCE_OFFSET = 28
+
+
+def _record_layout(num_axes: int, num_buttons: int, num_hats: int):
+    axes = RECORD_HEAD.size + (num_buttons + 63) // 64 * 8
+    values = axes + 8 * num_axes
+    hats = values + 8 * MAX_VALUES
+    report = hats + (2 * num_hats + 7) // 8 * 8
+    tail = report + REPORT.size
+    return axes, values, hats, report, tail, tail + SEQ.size
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+def _attach_existing(name: str):
+    """(existing block, its writer pid or None if it isn't a telemetry block)."""
+    existing = shared_memory.SharedMemory(name=name)
+    try:
+        if existing.size < HEADER.size:
+            return existing, None
+        fields = HEADER.unpack_from(existing.buf, 0)
+        if fields[0] != MAGIC or fields[1] != VERSION:
+            return existing, None
+        return existing, fields[-1]
+    except BaseException:
+        existing.close()
+        raise
+
+
+class TelemetryWriter:
+    """Publishes a record per tick. Never blocks and never allocates a buffer per tick."""
+
+    def __init__(self, num_axes: int, num_buttons: int, num_hats: int, name: str = DEFAULT_NAME,
+                 slots: int = DEFAULT_SLOTS):
+        self.num_axes = num_axes
+        self.num_buttons = num_buttons
+        self.num_hats = num_hats
+        self.slots = slots
+        self.button_bytes = (num_buttons + 7) // 8
+        self.button_mask = (1 << num_buttons) - 1
+        (self.axes_offset, self.values_offset, self.hats_offset,
+         self.report_offset, self.tail_offset, self.record_size) = _record_layout(num_axes, num_buttons, num_hats)
+        self.data_offset = HEADER.size + META_SIZE
+        size = self.data_offset + slots * self.record_size
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            self.shm = self._take_over_stale(name, size)
+        self.name = name
+        self.buf = self.shm.buf
+        self.sequence = 0
+        self.meta_sequence = 0
+        self._slots = []
+        self._width = 0
+        self._build_views()
+        HEADER.pack_into(self.buf, 0, MAGIC, VERSION, slots, self.record_size,
+                         num_axes, num_hats, MAX_VALUES, num_buttons, 0, 0, 0, os.getpid())
+
+    @staticmethod
+    def _take_over_stale(name: str, size: int):
+        # windows frees a block with its last handle, so an existing one always has a live writer.
+        # posix keeps it until unlinked: only reuse it if the writer that made it is gone
+        existing, pid = _attach_existing(name)
+        stale = sys.platform != 'win32' and pid is not None and not _pid_alive(pid)
+        if not stale:
+            existing.close()
+            owner = f"pid {pid}" if pid is not None else "another program"
+            raise RuntimeError(f"Telemetry block {name!r} is in use by {owner}, "
+                               f"stop it or run with --no-telemetry")
+        existing.unlink()
+        existing.close()
+        return shared_memory.SharedMemory(name=name, create=True, size=size)
+
+    def _build_views(self):
+        # per-slot views of the axes and values arrays, so a publish is a whole-view copy
+        self._slots = []
+        for i in range(self.slots):
+            base = self.data_offset + i * self.record_size
+            values = base + self.values_offset
+            self._slots.append((
+                base,
+                self.buf[base + self.axes_offset:values].cast('d'),
+                self.buf[values:values + 8 * self._width].cast('d'),
+            ))
+
+    def describe(self, value_names: List[str], combo_names: List[str], width: int):
+        """Names for the value slots and combo bits, width is len(values) publish() gets."""
+        meta = json.dumps({'values': value_names[:MAX_VALUES], 'combos': combo_names}).encode()
+        if len(meta) > META_SIZE:
+            raise RuntimeError("Too many outputs and combos to describe in the telemetry header")
+        if width > MAX_VALUES:
+            width = MAX_VALUES
+        if width != self._width:
+            self._width = width
+            self._build_views()
+        start = HEADER.size
+        self.buf[start:start + len(meta)] = meta
+        self.meta_sequence += 1
+        struct.pack_into('<QI', self.buf, META_SEQUENCE_OFFSET, self.meta_sequence, len(meta))
+
+    def publish(self, snapshot, values, combos: int, report):
+        sequence = self.sequence + 1
+        self.sequence = sequence
+        base, axes_view, values_view = self._slots[sequence % self.slots]
+        buf = self.buf
+        # head seq first, tail seq last: a reader sees them differ until the record is whole
+        RECORD_HEAD.pack_into(buf, base, sequence, snapshot.timestamp, combos)
+        start = base + RECORD_HEAD.size
+        buf[start:start + self.button_bytes] = (snapshot.buttons & self.button_mask).to_bytes(
+            self.button_bytes, 'little')
+        axes = snapshot.axes
+        if len(axes) == self.num_axes:
+            axes_view[:] = axes
+        else:
+            for i in range(min(len(axes), self.num_axes)):
+                axes_view[i] = axes[i]
+        if len(values) == self._width:
+            values_view[:] = values
+        else:
+            for i in range(self._width):
+                values_view[i] = values[i]
+        offset = base + self.hats_offset
+        hats = snapshot.hats
+        for i in range(min(len(hats), self.num_hats)):
+            HAT.pack_into(buf, offset + 2 * i, *hats[i])
+        REPORT.pack_into(buf, base + self.report_offset, report.buttons, report.left_x, report.left_y,
+                         report.right_x, report.right_y, report.left_trigger, report.right_trigger)
+        SEQ.pack_into(buf, base + self.tail_offset, sequence)
+        SEQ.pack_into(buf, SEQUENCE_OFFSET, sequence)
+
+    def close(self):
+        self._slots = []
+        self.buf = None
+        self.shm.close()
+        self.shm.unlink()
+
+
+class TelemetryFrame(NamedTuple):
+    """One decoded record. pressed() and hats match InputSnapshot, so display code takes either."""
+    sequence: int
+    timestamp: float
+    axes: Tuple[float, ...]
+    buttons: int
+    hats: Tuple[Tuple[int, int], ...]
+    values: Tuple[float, ...]
+    combos: int
+    report: Tuple[int, ...]  # buttons, left x, left y, right x, right y, left trigger, right trigger
+
+    def pressed(self, button_id) -> bool:
+        if not isinstance(button_id, int) or button_id < 0:
+            return False
+        return bool((self.buttons >> button_id) & 1)
+
+
+class TelemetryReader:
+    """Read-only attachment to a running mapper's telemetry block."""
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        tracked = False
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # before Python 3.13 every attach is tracked
+            self.shm = shared_memory.SharedMemory(name=name)
+            tracked = sys.platform != 'win32'
+        self.buf = self.shm.buf.toreadonly()
+        (magic, version, self.slots, self.record_size, self.num_axes, self.num_hats,
+         self.max_values, self.num_buttons, _, _, _, self.writer_pid) = HEADER.unpack_from(self.buf, 0)
+        if tracked and self.writer_pid != os.getpid():
+            # the tracker would unlink the writer's block when this process exits. a writer
+            # in this process shares the one registration, which its close() takes back
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise RuntimeError(f"shared memory {name!r} is not a version {VERSION} telemetry block")
+        (self.axes_offset, self.values_offset, self.hats_offset,
+         self.report_offset, self.tail_offset, _) = _record_layout(self.num_axes, self.num_buttons,
+                                                                   self.num_hats)
+        self.button_bytes = (self.num_buttons + 7) // 8
+        self.data_offset = HEADER.size + META_SIZE
+        self._meta_sequence = None
+        self._names = {'values': [], 'combos': []}
+        self._axes = struct.Struct(f'<{self.num_axes}d')
+        self._values = struct.Struct(f'<{self.max_values}d')
+        self._hats = struct.Struct(f'<{2 * self.num_hats}b')
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the newest complete record, 0 before the first."""
+        return SEQ.unpack_from(self.buf, SEQUENCE_OFFSET)[0]
+
+    def names(self) -> Dict[str, List[str]]:
+        meta_sequence, length = struct.unpack_from('<QI', self.buf, META_SEQUENCE_OFFSET)
+        if meta_sequence != self._meta_sequence and length:
+            self._names = json.loads(bytes(self.buf[HEADER.size:HEADER.size + length]))
+            self._meta_sequence = meta_sequence
+        return self._names
+
+    def slot_view(self, sequence: int) -> memoryview:
+        """Zero-copy view of the slot a record lives in; check its seq fields before trusting it."""
+        base = self.data_offset + (sequence % self.slots) * self.record_size
+        return self.buf[base:base + self.record_size]
+
+    def read(self, sequence: int = None):
+        """The record with this sequence (default: newest) or None if it was overwritten or torn."""
+        if sequence is None:
+            sequence = self.sequence
+        if sequence <= 0:
+            return None
+        base = self.data_offset + (sequence % self.slots) * self.record_size
+        buf = self.buf
+        # reverse of the writer's order: a matching tail means the record was finished,
+        # a head still matching afterwards means no overwrite started while copying it
+        if SEQ.unpack_from(buf, base + self.tail_offset)[0] != sequence:
+            return None
+        _, timestamp, combos = RECORD_HEAD.unpack_from(buf, base)
+        start = base + RECORD_HEAD.size
+        buttons = int.from_bytes(buf[start:start + self.button_bytes], 'little')
+        axes = self._axes.unpack_from(buf, base + self.axes_offset)
+        values = self._values.unpack_from(buf, base + self.values_offset)
+        flat = self._hats.unpack_from(buf, base + self.hats_offset)
+        report = REPORT.unpack_from(buf, base + self.report_offset)
+        if SEQ.unpack_from(buf, base)[0] != sequence:
+            return None
+        hats = tuple((flat[i], flat[i + 1]) for i in range(0, len(flat), 2))
+        return TelemetryFrame(sequence, timestamp, axes, buttons, hats,
+                              values[:len(self.names()['values'])], combos, report)
+
+    def value_dict(self, frame: TelemetryFrame) -> Dict[str, float]:
+        return dict(zip(self.names()['values'], frame.values))
+
+    def combo_names(self, frame: TelemetryFrame) -> List[str]:
+        return [name for i, name in enumerate(self.names()['combos']) if frame.combos & (1 << i)]
+
+    def close(self):
+        self.buf.release()
+        self.shm.close()
@@ -0,0 +1,73 @@
+import os
+import sys
+import threading
+from typing import Callable, List
+
+# frames per second for live displays, fast enough to read, far below the loop rate
+DEFAULT_RATE = 30.0
+
+
+class TerminalRenderer:
+    """Redraws a block of text lines on its own thread at a fixed rate."""
+
+    def __init__(self, render: Callable[[], List[str]], rate: float = DEFAULT_RATE,
+                 stream=None, top: int = 1):
+        self.render = render  # lines for a frame, should only read state the loop already keeps
+        self.interval = 1.0 / rate
+        self.stream = stream if stream is not None else sys.stdout
+        self.top = top  # screen row of the first line
+        self.previous: List[str] = []
+        self.frames = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def frame(self) -> str:
+        """Escape sequences that rewrite only the changed lines, with the cursor saved so prints land below."""
+        lines = self.render()
+        previous = self.previous
+        out = []
+        for row, line in enumerate(lines):
+            if row >= len(previous) or previous[row] != line:
+                out.append(f"\033[{self.top + row};1H{line}\033[K")
+        for row in range(len(lines), len(previous)):
+            out.append(f"\033[{self.top + row};1H\033[K")
+        self.previous = lines
+        if not out:
+            return ""
+        return "\0337" + "".join(out) + "\0338"
+
+    def draw(self):
+        out = self.frame()
+        if out:
+            self.stream.write(out)
+            self.stream.flush()
+        self.frames += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.draw()
+            except Exception as e:
+                # a broken display must not take the mapper down with it
+                self.stream.write(f"\nDisplay stopped: {e}\n")
+                return
+
+    def start(self):
+        if os.name == 'nt':
+            os.system('')  # enables ANSI escape handling in the Windows console
+        self.stream.write("\033[2J\033[?25l")  # clear screen, hide cursor
+        self.draw()
+        # ordinary output starts on the line below the block
+        self.stream.write(f"\033[{self.top + len(self.previous) + 1};1H")
+        self.stream.flush()
+        self._thread = threading.Thread(target=self._run, name="terminal", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.stream.write("\033[?25h\n")  # cursor back on
+        self.stream.flush()
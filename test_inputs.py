@@ -1,13 +1,15 @@
 from joystick_manager import JoystickManager
+from terminal import TerminalRenderer
+from telemetry import TelemetryReader
 import pygame
 import time
 import vgamepad as vg
 
-def format_state(num_axes, num_buttons, joystick, inputs):
-    state = "\033[H\n"  # reset
+def format_state(num_buttons, snapshot, inputs):
+    state = []
     
     # Main controls
-    state += "=== Flight Controls ===\n"
+    state.append("=== Flight Controls ===")
     controls = {
         "Roll (X)": inputs.get('x', 0),
         "Pitch (Y)": inputs.get('y', 0),
@@ -16,66 +18,107 @@ def format_state(num_axes, num_buttons, joystick, inputs):
     }
     for name, value in controls.items():
         marker = "█" * int((value + 1) * 10)
-        state += f"{name:>12}: {value:>6.2f} |{marker:21}|\n"
+        state.append(f"{name:>12}: {value:>6.2f} |{marker:21}|")
     
     # Active buttons
-    state += "\n=== Active Buttons ===\n"
+    state.append("")
+    state.append("=== Active Buttons ===")
     active = []
     for i in range(num_buttons):
-        if joystick.get_button(i):
+        if snapshot.pressed(i):
             active.append(str(i))
-    state += "Pressed: " + (" ".join(active) if active else "None") + " "*20 + "\n"
+    state.append("Pressed: " + (" ".join(active) if active else "None"))
     
     # # all XUSB buttons
-    # state += "\n=== XUSB Button Mappings ===\n"
+    # state.append("")
+    # state.append("=== XUSB Button Mappings ===")
     # for attr in dir(vg.XUSB_BUTTON):
     #     if attr.startswith('XUSB_GAMEPAD_'):
     #         value = getattr(vg.XUSB_BUTTON, attr)
-    #         state += f"{attr[13:]:15}: {value:#06x}\n" 
-    
-    # clear rest of screen
-    state += "\033[J"
+    #         state.append(f"{attr[13:]:15}: {value:#06x}")
     
     # Hat switch
-    if joystick.get_numhats() > 0:
-        hat = joystick.get_hat(0)
-        state += f"\n=== Hat Switch ===\n"
-        state += f"X/Y: {hat[0]:>3}/{hat[1]:<3} "
+    if snapshot.hats:
+        hat = snapshot.hats[0]
+        state.append("")
+        state.append("=== Hat Switch ===")
+        line = f"X/Y: {hat[0]:>3}/{hat[1]:<3} "
         direction = ""
         if hat[1] > 0: direction += "↑"
         if hat[1] < 0: direction += "↓"
         if hat[0] > 0: direction += "→"
         if hat[0] < 0: direction += "←"
-        state += direction if direction else "centered"
+        state.append(line + (direction if direction else "centered"))
     
     return state
 
+def format_pad(reader, frame):
+    # what the running mapper sent to the virtual pad on this tick
+    buttons, left_x, left_y, right_x, right_y, left_trigger, right_trigger = frame.report
+    return [
+        "",
+        "=== Virtual Pad ===",
+        f"Buttons: {buttons:#06x}  Triggers: {left_trigger:>3}/{right_trigger:<3}",
+        f"Left stick: {left_x:>6}/{left_y:<6}  Right stick: {right_x:>6}/{right_y:<6}",
+        "Combos: " + (", ".join(reader.combo_names(frame)) or "none"),
+        f"Tick: {frame.sequence}",
+    ]
+
+def watch_telemetry(reader):
+    # the mapper owns the stick, show what it publishes instead of reading the device
+    last = [None]
+
+    def render():
+        frame = reader.read()
+        if frame is None:
+            # torn or not written yet, keep showing the previous frame
+            frame = last[0]
+            if frame is None:
+                return ["Waiting for ace_combat.py..."]
+        last[0] = frame
+        num_buttons = max(frame.buttons.bit_length(), 1)
+        return format_state(num_buttons, frame, reader.value_dict(frame)) + format_pad(reader, frame)
+
+    display = TerminalRenderer(render)
+    display.start()
+    try:
+        while True:
+            time.sleep(0.25)
+    except KeyboardInterrupt:
+        display.stop()
+        reader.close()
+        print("Exiting...")
+
 def main():
+    try:
+        reader = TelemetryReader()
+    except FileNotFoundError:
+        reader = None
+    if reader is not None:
+        watch_telemetry(reader)
+        return
+
     manager = JoystickManager()
-    joystick = manager.joystick
+    manager.process(manager.capture())
     
-    # clear screen once at start
-    print("\033[2J")  # clear screen
-    print("\033[?25l")  # hide cursor
+    # the display redraws at its own rate from whatever was sampled last
+    display = TerminalRenderer(lambda: format_state(
+        manager.num_buttons,
+        manager.snapshot,
+        manager.plan.to_dict(manager.pipeline.values)
+    ))
+    display.start()
+    manager.enable_input_events()
     
     try:
+        # every joystick event is processed, not just one per frame
         while True:
-            pygame.event.pump()
-            inputs = manager.get_processed_input()
-            
-            state = format_state(
-                joystick.get_numaxes(),
-                joystick.get_numbuttons(),
-                joystick,
-                inputs
-            )
-            
-            print(state)
-            time.sleep(0.1)
+            manager.process(manager.capture())
+            manager.wait_for_input(0.25)
             
     except KeyboardInterrupt:
-        print("\033[?25h")  # cursor
-        print("\nExiting...")
+        display.stop()
+        print("Exiting...")
 
 if __name__ == "__main__":
     main()
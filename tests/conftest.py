@@ -0,0 +1,42 @@
+import copy
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from ace_combat import AceCombatController  # noqa: E402
+from backends import FakeGamepad, FakeInput  # noqa: E402
+
+with open(os.path.join(ROOT, 'config.json'), 'r') as f:
+    BASE_CONFIG = json.load(f)
+
+
+def sample(buttons: int = 0, axes=(0.0, 0.0, 0.0, 0.0), hat=(0, 0)):
+    """One FakeInput sample for the default 4 axis, 12 button, 1 hat device."""
+    return list(axes), buttons, [hat]
+
+
+@pytest.fixture
+def config():
+    """Fresh copy of the shipped config.json, without the keyboard kill switch."""
+    config = copy.deepcopy(BASE_CONFIG)
+    config['kill_switch'].pop('key', None)
+    return config
+
+
+@pytest.fixture
+def make_controller(tmp_path):
+    """Controller on a FakeInput trace and a FakeGamepad, with config written to a temp file."""
+    def make(config, samples=None, loop=False):
+        path = tmp_path / 'config.json'
+        path.write_text(json.dumps(config))
+        device = FakeInput(samples or [sample()], loop=loop)
+        pad = FakeGamepad()
+        controller = AceCombatController(device=device, gamepad=pad, hook_keyboard=False,
+                                         config_path=str(path))
+        return controller, device, pad
+    return make
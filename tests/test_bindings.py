@@ -0,0 +1,100 @@
+import pytest
+
+from bindings import DISABLEABLE_AXES, XUSB_BUTTONS, compile_bindings
+from conftest import sample
+
+A = XUSB_BUTTONS['XUSB_GAMEPAD_A']
+B = XUSB_BUTTONS['XUSB_GAMEPAD_B']
+X = XUSB_BUTTONS['XUSB_GAMEPAD_X']
+THUMBS = XUSB_BUTTONS['XUSB_GAMEPAD_LEFT_THUMB'] | XUSB_BUTTONS['XUSB_GAMEPAD_RIGHT_THUMB']
+
+
+def test_table_per_byte_group():
+    table = compile_bindings({'standard': {
+        'a': {'button': 1, 'xusb': 'XUSB_GAMEPAD_A'},
+        'b': {'button': 9, 'xusb': 'XUSB_GAMEPAD_B'},
+        'x': {'button': 17, 'xusb': 'XUSB_GAMEPAD_X'},
+    }})
+    assert len(table.tables) == 3
+    assert table.evaluate(0) == 0
+    assert table.evaluate(1 << 1) == A
+    assert table.evaluate((1 << 9) | (1 << 17)) == B | X
+    # unbound buttons in a bound group don't leak anything
+    assert table.evaluate((1 << 0) | (1 << 8) | (1 << 16)) == 0
+
+
+def test_shared_button_ors_outputs():
+    table = compile_bindings({'standard': {
+        'a': {'button': 2, 'xusb': 'XUSB_GAMEPAD_A'},
+        'b': {'button': 2, 'xusb': 'XUSB_GAMEPAD_B'},
+    }})
+    assert table.evaluate(1 << 2) == A | B
+
+
+def test_hold_combo_outputs(config):
+    table = compile_bindings(config['bindings'])
+    assert table.evaluate(1 << 4) == THUMBS
+    assert table.active_names() == ['flares']
+    assert table.analog_override() is None
+
+    table.evaluate(1 << 2)
+    assert table.disabled == DISABLEABLE_AXES['throttle']
+    assert table.active_names() == ['high_g_turn']
+    assert table.analog_override() == (1.0, 1.0)
+
+    table.evaluate(0)
+    assert table.active == table.disabled == 0
+
+
+def test_null_button_is_unbound():
+    table = compile_bindings({'standard': {'a': {'button': None, 'xusb': 'XUSB_GAMEPAD_A'}}})
+    assert table.tables == ()
+    assert table.evaluate(0xFFFF) == 0
+
+
+@pytest.mark.parametrize('bindings', [
+    {'standard': {'a': {'button': 1, 'xusb': 'XUSB_GAMEPAD_NOPE'}}},
+    {'standard': {'a': {'button': -1, 'xusb': 'XUSB_GAMEPAD_A'}}},
+    {'standard': {'a': {'button': True, 'xusb': 'XUSB_GAMEPAD_A'}}},
+    {'combos': {'c': {'trigger': 1, 'disable_axes': ['roll']}}},
+    {'combos': {'c': {'trigger': 1, 'analog': [1.0]}}},
+    {'combos': {'c': {'trigger': 1, 'analog': {'left_trigger': 'full'}}}},
+    {'standard': {'a': 'XUSB_GAMEPAD_A'}},
+    {'standard': ['a']},
+    {'combos': {'c': 4}},
+    {'combos': {'c': {'trigger': 1, 'xusb': 'XUSB_GAMEPAD_A'}}},
+    {'combos': {'c': {'trigger': 1, 'xusb': [['XUSB_GAMEPAD_A']]}}},
+    {'combos': {'c': {'trigger': 1, 'disable_axes': 'throttle'}}},
+    'standard',
+])
+def test_invalid_bindings_raise(bindings):
+    with pytest.raises(RuntimeError, match="Invalid"):
+        compile_bindings(bindings, num_buttons=12)
+
+
+def test_analog_true_is_both_triggers():
+    table = compile_bindings({'combos': {'c': {'trigger': 1, 'analog': True}}})
+    table.evaluate(1 << 1)
+    assert table.analog_override() == (1.0, 1.0)
+    table = compile_bindings({'combos': {'c': {'trigger': 1, 'analog': False}}})
+    table.evaluate(1 << 1)
+    assert table.analog_override() is None
+
+
+def test_button_out_of_device_range():
+    with pytest.raises(RuntimeError, match="does not exist"):
+        compile_bindings({'standard': {'a': {'button': 12, 'xusb': 'XUSB_GAMEPAD_A'}}}, num_buttons=12)
+
+
+def test_controller_drives_pad(config, make_controller):
+    controller, _, pad = make_controller(config, [sample(), sample(1 << 1), sample(1 << 2), sample()])
+    controller.tick()
+    assert pad.buttons == 0
+    controller.tick()
+    assert pad.buttons == A
+    controller.tick()
+    # high_g_turn: both triggers held, throttle handed over to the combo
+    assert pad.buttons == 0
+    assert (pad.left_trigger_value, pad.right_trigger_value) == (255, 255)
+    controller.tick()
+    assert (pad.buttons, pad.left_trigger_value, pad.right_trigger_value) == (0, 0, 0)
@@ -0,0 +1,133 @@
+import json
+import os
+import time
+
+from bindings import XUSB_BUTTONS
+from config_watch import ConfigWatcher
+from conftest import sample
+
+
+def rewrite(path, config):
+    path.write_text(config if isinstance(config, str) else json.dumps(config))
+    # make sure the change is visible even on coarse mtime filesystems
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def poll_until_ready(watcher, timeout=2.0):
+    """Polls like the control loop until a build is handed over, or gives up once one has finished."""
+    deadline = time.monotonic() + timeout
+    started = False
+    while time.monotonic() < deadline:
+        ready = watcher.poll(time.monotonic())
+        if ready is not None:
+            return ready
+        if watcher.building:
+            started = True
+        elif started:
+            return watcher.poll(time.monotonic())
+        time.sleep(0.001)
+    return None
+
+
+def test_unchanged_file_never_builds(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{}')
+    built = []
+    watcher = ConfigWatcher(str(path), built.append)
+    for i in range(5):
+        assert watcher.poll(i * watcher.interval) is None
+    assert not watcher.building and built == []
+
+
+def test_change_is_built_off_thread_and_handed_over_once(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{}')
+    watcher = ConfigWatcher(str(path), lambda config: ('built', config), interval=0.0)
+    rewrite(path, {'version': 2})
+    assert poll_until_ready(watcher) == ('built', {'version': 2})
+    assert watcher.poll(time.monotonic()) is None
+
+
+def test_poll_is_rate_limited(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{}')
+    watcher = ConfigWatcher(str(path), lambda config: config, interval=0.5)
+    watcher.poll(0.0)
+    rewrite(path, {'a': 1})
+    # within the interval the file isn't even looked at
+    watcher.poll(0.1)
+    assert not watcher.building and watcher.ready is None
+
+
+def test_failed_builds_keep_running_mapping(tmp_path, capsys):
+    path = tmp_path / 'config.json'
+    path.write_text('{}')
+
+    def build(config):
+        return config['bindings']['standard']  # KeyError, not a RuntimeError
+
+    watcher = ConfigWatcher(str(path), build, interval=0.0)
+    for content in ('{"half written', '{}'):
+        rewrite(path, content)
+        assert poll_until_ready(watcher) is None
+        assert not watcher.building
+    assert capsys.readouterr().out.count("Config reload failed") == 2
+
+
+def test_controller_swaps_in_reload(config, make_controller, tmp_path):
+    controller, _, pad = make_controller(config, [sample(1 << 1)], loop=True)
+    controller.watch_config()
+    controller.config_watcher.interval = 0.0
+    controller.tick()
+    assert pad.buttons == XUSB_BUTTONS['XUSB_GAMEPAD_A']
+
+    config['bindings']['standard']['fire_gun']['xusb'] = 'XUSB_GAMEPAD_Y'
+    rewrite(tmp_path / 'config.json', config)
+    deadline = time.monotonic() + 5.0
+    while pad.buttons != XUSB_BUTTONS['XUSB_GAMEPAD_Y'] and time.monotonic() < deadline:
+        controller.tick()
+        time.sleep(0.001)
+    assert pad.buttons == XUSB_BUTTONS['XUSB_GAMEPAD_Y']
+
+
+class Handoff:
+    """Stands in for the watcher: hands over one prebuilt mapping on the next poll."""
+
+    def __init__(self, mapping):
+        self.ready = mapping
+
+    def poll(self, now):
+        ready, self.ready = self.ready, None
+        return ready
+
+
+def test_held_tap_trigger_is_not_a_press_after_reload(config, make_controller):
+    config['bindings']['combos'] = {'c': {'mode': 'tap', 'trigger': 3, 'xusb': ['XUSB_GAMEPAD_Y'], 'tap_ms': 200}}
+    controller, _, pad = make_controller(config, [sample(1 << 3), sample(1 << 3), sample(), sample()])
+    controller.tick()
+    controller.config_watcher = Handoff(controller.manager.build(config))
+    controller.tick()
+    controller.tick()
+    controller.tick()
+    assert pad.buttons & XUSB_BUTTONS['XUSB_GAMEPAD_Y'] == 0
+
+
+def test_held_switch_chord_survives_reload(config, make_controller):
+    config['bindings']['standard']['fire_gun']['button'] = 8
+    config['profiles'] = {'a10': {'rudder': {'mode': 'pwm'}}}
+    config['profile_switch'] = {'cycle': {'chord': [7, 8]}}
+    chord = (1 << 7) | (1 << 8)
+    samples = [sample(chord), sample(chord), sample(chord), sample(), sample(1 << 8)]
+    controller, _, pad = make_controller(config, samples)
+    controller.tick()
+    assert controller.manager.mapping.name == 'a10'
+    controller.config_watcher = Handoff(controller.manager.build(config))
+    names = []
+    buttons = []
+    for _ in range(4):
+        controller.tick()
+        names.append(controller.manager.mapping.name)
+        buttons.append(pad.buttons & XUSB_BUTTONS['XUSB_GAMEPAD_A'])
+    assert names == ['a10'] * 4
+    assert buttons == [0, 0, 0, XUSB_BUTTONS['XUSB_GAMEPAD_A']]
@@ -0,0 +1,79 @@
+from array import array
+
+import pytest
+
+from axis_plan import AxisPipeline, compile_axis_plan
+from curves import build_lut, lookup, parse_calibration, parse_curve
+from input_snapshot import InputSnapshot
+
+
+def test_linear_lut_matches_plain_math():
+    table = build_lut(0.1, 1.0)
+    assert lookup(table, 0.05) == 0.0
+    assert lookup(table, -0.05) == 0.0
+    assert lookup(table, 0.55) == pytest.approx(0.5, abs=1e-3)
+    assert lookup(table, -0.55) == pytest.approx(-0.5, abs=1e-3)
+    assert lookup(table, 1.0) == 1.0
+    assert lookup(table, -2.0) == -1.0
+
+
+def test_sensitivity_clamps():
+    table = build_lut(0.0, 2.0)
+    assert lookup(table, 0.25) == pytest.approx(0.5, abs=1e-3)
+    assert lookup(table, 0.75) == 1.0
+
+
+def test_expo_is_mirrored():
+    table = build_lut(0.0, 1.0, parse_curve({'type': 'expo', 'amount': 1.0}, 'x'))
+    assert lookup(table, 0.5) == pytest.approx(0.125, abs=1e-3)
+    assert lookup(table, -0.5) == pytest.approx(-0.125, abs=1e-3)
+
+
+def test_spline_passes_through_points_without_overshoot():
+    points = [[0, 0], [0.5, 0.2], [0.8, 0.9], [1, 1]]
+    curve = parse_curve(points, 'x')
+    for x, y in points:
+        assert curve(x) == pytest.approx(y)
+    samples = [curve(i / 200) for i in range(201)]
+    # monotone input points give a monotone curve inside 0..1
+    assert all(b >= a for a, b in zip(samples, samples[1:]))
+    assert min(samples) >= 0.0 and max(samples) <= 1.0
+
+
+def test_spline_endpoints_are_filled_in():
+    curve = parse_curve({'type': 'spline', 'points': [[0.5, 0.3]]}, 'x')
+    assert curve(0.0) == pytest.approx(0.0)
+    assert curve(1.0) == pytest.approx(0.3)
+
+
+@pytest.mark.parametrize('curve', [
+    {'type': 'cubic'},
+    {'type': 'expo', 'amount': 2},
+    {'type': 'power', 'exponent': 0},
+    {'type': 'spline', 'points': [[0, 0], [0, 1]]},
+    {'type': 'spline', 'points': [[0, 0], [1.5, 1]]},
+    [[0, 0], 'x'],
+])
+def test_invalid_curves_raise(curve):
+    with pytest.raises(RuntimeError, match="Invalid curve for axis x"):
+        parse_curve(curve, 'x')
+
+
+def test_calibration_recenters():
+    table = build_lut(0.0, 1.0, calibration=parse_calibration({'center': 0.1, 'min': -0.8, 'max': 0.9}, 'x'))
+    assert lookup(table, 0.1) == pytest.approx(0.0, abs=1e-3)
+    assert lookup(table, 0.9) == pytest.approx(1.0, abs=1e-3)
+    assert lookup(table, -0.8) == pytest.approx(-1.0, abs=1e-3)
+
+
+def test_pipeline_uses_the_table():
+    config = {
+        'axes': {'x': {'deadzone': 0.0, 'sensitivity': 1.0, 'curve': {'type': 'power', 'exponent': 2.0}},
+                 'y': {'deadzone': 0.0, 'sensitivity': 1.0}},
+        'axis_mapping': {'x': 0, 'y': 1},
+    }
+    plan = compile_axis_plan(config, 2)
+    pipeline = AxisPipeline(plan)
+    values = pipeline.run(InputSnapshot(0.0, array('d', [-0.5, -0.5]), 0, ()))
+    assert values[plan.slot('x')] == pytest.approx(-0.25, abs=1e-3)
+    assert values[plan.slot('y')] == pytest.approx(-0.5)
@@ -0,0 +1,83 @@
+from array import array
+
+import pytest
+
+from ace_combat import FILTER_SETTLE_TIMEOUT
+from conftest import sample
+from filters import OneEuroBank, parse_filter
+
+
+def bank(min_cutoff=1.0, beta=0.0, d_cutoff=1.0):
+    # filters device axis 1 of 2, axis 0 passes through
+    return OneEuroBank(['y'], [1], [(min_cutoff, beta, d_cutoff)])
+
+
+def test_first_sample_passes_through():
+    filters = bank()
+    out = filters.run(array('d', [0.3, 0.7]), 1.0)
+    assert list(out) == [0.3, 0.7]
+    assert filters.settled
+
+
+def test_step_is_smoothed_and_settles():
+    filters = bank(min_cutoff=1.0)
+    filters.run(array('d', [0.0, 0.0]), 0.0)
+    out = filters.run(array('d', [1.0, 1.0]), 0.01)
+    # unfiltered axis follows at once, the filtered one moves a fraction of the way
+    assert out[0] == 1.0
+    assert 0.0 < out[1] < 0.1
+    assert not filters.settled
+    t = 0.01
+    while not filters.settled and t < 10.0:
+        t += 0.01
+        out = filters.run(array('d', [1.0, 1.0]), t)
+    assert filters.settled
+    assert out[1] == pytest.approx(1.0, abs=1e-4)
+
+
+def test_beta_tracks_fast_motion_closer():
+    slow, fast = bank(beta=0.0), bank(beta=10.0)
+    for filters in (slow, fast):
+        filters.run(array('d', [0.0, 0.0]), 0.0)
+        for i in range(1, 6):
+            filters.run(array('d', [0.0, i * 0.1]), i * 0.01)
+    assert fast.out[1] > slow.out[1]
+
+
+def test_repeated_timestamp_holds_output():
+    filters = bank()
+    filters.run(array('d', [0.0, 0.0]), 0.0)
+    first = filters.run(array('d', [0.0, 1.0]), 0.01)[1]
+    assert filters.run(array('d', [0.0, -1.0]), 0.01)[1] == first
+
+
+def test_reset_restarts_from_next_sample():
+    filters = bank()
+    filters.run(array('d', [0.0, 0.0]), 0.0)
+    filters.reset()
+    assert filters.run(array('d', [0.0, 0.8]), 0.01)[1] == 0.8
+
+
+@pytest.mark.parametrize('spec', [
+    {'type': 'kalman'},
+    {'type': 'one_euro', 'min_cutoff': 0},
+    {'type': 'one_euro', 'beta': -1},
+    {'type': 'one_euro', 'd_cutoff': 'fast'},
+])
+def test_invalid_filter_raises(spec):
+    with pytest.raises(RuntimeError, match="Invalid filter for axis y"):
+        parse_filter(spec, 'y')
+
+
+def test_none_type_is_unfiltered():
+    assert parse_filter({'type': 'none'}, 'y') is None
+    assert parse_filter(None, 'y') is None
+
+
+def test_event_wait_shortened_until_settled(config, make_controller):
+    config['axes']['x']['filter'] = {'type': 'one_euro', 'min_cutoff': 1.0}
+    controller, _, _ = make_controller(config, [sample(), sample(axes=(1.0, 0.0, 0.0, 0.0))])
+    controller.tick()
+    assert controller.wait_timeout(0.25) == 0.25
+    controller.tick()
+    assert controller.wait_timeout(0.25) <= FILTER_SETTLE_TIMEOUT
@@ -0,0 +1,121 @@
+import pytest
+
+from bindings import XUSB_BUTTONS
+from conftest import sample
+from profiles import CYCLE, DEFAULT_PROFILE, ProfileSet, compile_profile_switch, expand_profiles
+
+A = XUSB_BUTTONS['XUSB_GAMEPAD_A']
+CHORD = (1 << 7) | (1 << 8)
+
+
+def test_expand_replaces_whole_sections():
+    config = {
+        'axes': {'x': {'deadzone': 0.1}},
+        'rudder': {'mode': 'binary'},
+        'kill_switch': {'button': 6},
+        'profiles': {'a10': {'rudder': {'mode': 'pwm'}}},
+        'profile_switch': {},
+    }
+    (default_name, default), (name, a10) = expand_profiles(config)
+    assert default_name == DEFAULT_PROFILE and name == 'a10'
+    assert 'profiles' not in default and 'profile_switch' not in default
+    assert a10['rudder'] == {'mode': 'pwm'}
+    # everything else is shared with the default profile
+    assert a10['axes'] is default['axes']
+    assert a10['kill_switch'] == {'button': 6}
+
+
+@pytest.mark.parametrize('profiles', [
+    ['a10'],
+    {'default': {}},
+    {'a10': []},
+    {'a10': {'devices': {}}},
+])
+def test_expand_rejects_bad_profiles(profiles):
+    with pytest.raises(RuntimeError, match="Invalid profile"):
+        expand_profiles({'profiles': profiles})
+
+
+def test_compile_switch():
+    chords, keys = compile_profile_switch({
+        'cycle': {'chord': [7], 'key': 'f9'},
+        'select': {'a10': {'chord': [7, 8], 'key': 'f2'}},
+    }, ['default', 'a10'], 12)
+    # the bigger chord is checked first so the one inside it can't shadow it
+    assert chords == [(CHORD, 'a10'), (1 << 7, CYCLE)]
+    assert keys == {'f9': CYCLE, 'f2': 'a10'}
+
+
+@pytest.mark.parametrize('settings', [
+    {'select': {'su30': {'key': 'f2'}}},
+    {'cycle': {'chord': [12]}},
+    {'cycle': {'chord': []}},
+    {'cycle': {'key': 'f1'}, 'select': {'a10': {'key': 'f1'}}},
+    {'cycle': {'chord': [1, 2]}, 'select': {'a10': {'chord': [2, 1]}}},
+])
+def test_compile_switch_rejects(settings):
+    with pytest.raises(RuntimeError, match="Invalid profile switch"):
+        compile_profile_switch(settings, ['default', 'a10'], 12)
+
+
+class Mapping:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_chord_fires_once_and_suppresses_until_released():
+    profiles = ProfileSet([Mapping('default'), Mapping('a10')], [(CHORD, CYCLE)], {})
+    assert profiles.poll(1 << 7) is None
+    assert profiles.poll(CHORD) == CYCLE
+    assert profiles.suppressed == CHORD
+    # holding it doesn't switch again
+    assert profiles.poll(CHORD) is None
+    assert profiles.poll(1 << 8) is None
+    assert profiles.suppressed == CHORD
+    profiles.poll(0)
+    assert profiles.suppressed == 0
+
+
+def test_target_resolution():
+    profiles = ProfileSet([Mapping('default'), Mapping('a10')], [], {})
+    assert profiles.target(CYCLE, 0) == 1
+    assert profiles.target(CYCLE, 1) == 0
+    assert profiles.target('a10', 0) == 1
+    assert profiles.target('gone', 0) is None
+
+
+@pytest.fixture
+def profiled(config):
+    config['bindings']['standard']['fire_gun']['button'] = 8
+    config['profiles'] = {'a10': {'rudder': {'mode': 'pwm'}}}
+    config['profile_switch'] = {'cycle': {'chord': [7, 8]}, 'select': {'a10': {'key': 'f2'}}}
+    return config
+
+
+def test_controller_chord_switch_doesnt_press(profiled, make_controller):
+    samples = [sample(), sample(1 << 7), sample(CHORD), sample(1 << 8), sample(), sample(1 << 8)]
+    controller, _, pad = make_controller(profiled, samples)
+    names = []
+    buttons = []
+    for _ in samples:
+        controller.tick()
+        names.append(controller.manager.mapping.name)
+        buttons.append(pad.buttons & A)
+    assert names == ['default', 'default', 'a10', 'a10', 'a10', 'a10']
+    # button 8 is fire_gun, but not while it's part of the held switch chord
+    assert buttons == [0, 0, 0, 0, 0, A]
+    assert controller.rudder_pwm is not None
+
+
+def test_controller_key_targets_by_name(profiled, make_controller):
+    controller, _, _ = make_controller(profiled)
+    controller.request_profile('a10')
+    controller.tick()
+    assert controller.manager.mapping.name == 'a10'
+    # a reloaded config without that profile ignores the key
+    del profiled['profiles']
+    profiled['profile_switch'] = {}
+    controller.apply_mapping(controller.manager.build(profiled))
+    controller.request_profile('a10')
+    controller.tick()
+    assert controller.manager.mapping.name == 'default'
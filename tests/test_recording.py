@@ -0,0 +1,83 @@
+import json
+import struct
+
+import pytest
+
+from ace_combat import AceCombatController
+from backends import FakeGamepad, FakeInput
+from conftest import sample
+from recording import HEADER, MAGIC, Recording, RecordingInput, ReplayInput
+
+
+def record(path, samples, **device):
+    recorder = RecordingInput(FakeInput(samples, loop=False, **device), str(path))
+    snapshots = [recorder.read() for _ in samples]
+    recorder.close()
+    return snapshots
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'trace.ac7r'
+    samples = [sample(1 << 3, (0.5, -0.25, 0.0, 1.0), (1, -1)), sample(0, (0.0, 0.0, 0.0, -1.0))]
+    recorded = record(path, samples)
+    replay = ReplayInput(str(path), realtime=False)
+    try:
+        assert (replay.num_axes, replay.num_buttons, replay.num_hats) == (4, 12, 1)
+        for snapshot in recorded:
+            played = replay.read()
+            assert list(played.axes) == list(snapshot.axes)
+            assert played.buttons == snapshot.buttons
+            assert played.hats == snapshot.hats
+        assert replay.exhausted
+    finally:
+        replay.close()
+
+
+def test_more_than_64_buttons(tmp_path):
+    path = tmp_path / 'trace.ac7r'
+    buttons = (1 << 95) | (1 << 64) | 1
+    record(path, [([0.0] * 4, buttons, [(0, 0)])], num_buttons=96)
+    recording = Recording(str(path))
+    try:
+        assert recording.sample(0).buttons == buttons
+    finally:
+        recording.close()
+
+
+def test_version_1_files_still_load(tmp_path):
+    path = tmp_path / 'old.ac7r'
+    path.write_bytes(HEADER.pack(MAGIC, 1, 1, 12, 1) + struct.pack('<qfQ2b', 0, 0.5, 1 << 7, 0, 1))
+    recording = Recording(str(path))
+    try:
+        snapshot = recording.sample(0)
+        assert snapshot.buttons == 1 << 7 and snapshot.hats == ((0, 1),)
+    finally:
+        recording.close()
+
+
+def test_not_a_recording(tmp_path):
+    path = tmp_path / 'junk.ac7r'
+    path.write_bytes(b'nope' * 4)
+    with pytest.raises(RuntimeError, match="not an input recording"):
+        Recording(str(path))
+
+
+def test_controller_records_the_device_it_opened(config, tmp_path):
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps(config))
+    path = tmp_path / 'trace.ac7r'
+    device = FakeInput([sample(), sample(1 << 1)], loop=False)
+    controller = AceCombatController(device=device, gamepad=FakeGamepad(), hook_keyboard=False,
+                                     config_path=str(config_path),
+                                     wrap_device=lambda source: RecordingInput(source, str(path)))
+    controller.tick()
+    controller.tick()
+    controller.cleanup()
+    recorder = controller.manager.device
+    assert recorder.device is device
+    recorder.close()
+    recording = Recording(str(path))
+    try:
+        assert len(recording) == 2 and recording.sample(1).buttons == 1 << 1
+    finally:
+        recording.close()
@@ -0,0 +1,81 @@
+import pytest
+
+from conftest import sample
+from rudder import LEFT_SHOULDER, RIGHT_SHOULDER, PwmRudder, compile_rudder
+
+
+def duty_over(rudder, yaw, periods=4, steps=4000):
+    """Fraction of time the button is held, sampled evenly over a few carrier periods."""
+    held = 0
+    span = rudder.period * periods
+    for i in range(steps):
+        if rudder.update(yaw, i * span / steps):
+            held += 1
+    return held / steps
+
+
+def test_deadband_and_full():
+    rudder = PwmRudder(frequency=10, deadband=0.15, hysteresis=0.05, full=0.9)
+    assert rudder.update(0.1, 0.0) == 0
+    assert rudder.next_edge is None
+    assert rudder.update(0.95, 0.0) == RIGHT_SHOULDER
+    assert rudder.next_edge is None
+    assert rudder.update(-0.95, 0.0) == LEFT_SHOULDER
+
+
+def test_duty_grows_with_yaw():
+    low = duty_over(PwmRudder(frequency=10, min_pulse_ms=0), 0.3)
+    high = duty_over(PwmRudder(frequency=10, min_pulse_ms=0), 0.7)
+    # duty is (yaw - release) / (full - release) with release 0.1, full 0.9
+    assert low == pytest.approx(0.25, abs=0.01)
+    assert high == pytest.approx(0.75, abs=0.01)
+
+
+def test_hysteresis():
+    rudder = PwmRudder(deadband=0.15, hysteresis=0.05)
+    rudder.update(0.2, 0.0)
+    assert rudder.engaged
+    rudder.update(0.12, 0.01)
+    assert rudder.engaged
+    rudder.update(0.09, 0.02)
+    assert not rudder.engaged
+
+
+def test_min_pulse_width():
+    rudder = PwmRudder(frequency=10, min_pulse_ms=20)
+    assert duty_over(rudder, 0.16) == pytest.approx(0.2, abs=0.01)
+
+
+def test_next_edge_lands_on_flips():
+    rudder = PwmRudder(frequency=10, min_pulse_ms=0)
+    assert rudder.update(0.5, 0.0) == RIGHT_SHOULDER
+    edge = rudder.next_edge
+    assert edge == pytest.approx(0.05)
+    assert rudder.update(0.5, edge) == 0
+    assert rudder.next_edge == pytest.approx(0.1)
+    assert rudder.update(0.5, rudder.next_edge) == RIGHT_SHOULDER
+
+
+def test_reset_disengages():
+    rudder = PwmRudder()
+    rudder.update(0.5, 0.0)
+    rudder.reset()
+    assert not rudder.engaged and rudder.next_edge is None
+
+
+def test_compile_rudder():
+    assert compile_rudder(None) == (0.3, None)
+    threshold, rudder = compile_rudder({'mode': 'pwm', 'frequency': 5})
+    assert rudder.period == pytest.approx(0.2)
+    for settings in ({'mode': 'analog'}, {'mode': 'pwm', 'frequency': 0},
+                     {'mode': 'pwm', 'deadband': 0.5, 'full': 0.4}):
+        with pytest.raises(RuntimeError, match="Invalid rudder setting"):
+            compile_rudder(settings)
+
+
+def test_controller_pulses_shoulder(config, make_controller):
+    config['rudder'] = {'mode': 'pwm'}
+    controller, _, pad = make_controller(config, [sample(axes=(0.0, 0.0, 0.6, 0.0))])
+    controller.tick()
+    assert pad.buttons & RIGHT_SHOULDER
+    assert 0.0 < controller.wait_timeout(1.0) < controller.rudder_pwm.period
@@ -0,0 +1,149 @@
+import os
+import subprocess
+import sys
+from array import array
+
+import pytest
+
+from conftest import sample
+from input_snapshot import InputSnapshot
+from telemetry import HEADER, SEQ, TelemetryReader, TelemetryWriter
+from xusb_report import XusbReport
+
+
+@pytest.fixture
+def name():
+    return f'ac7sm_test_{os.getpid()}'
+
+
+@pytest.fixture
+def writer(name):
+    writer = TelemetryWriter(4, 12, 1, name=name, slots=8)
+    writer.describe(['roll', 'pitch'], ['flares'], 2)
+    yield writer
+    writer.close()
+
+
+@pytest.fixture
+def reader(writer, name):
+    reader = TelemetryReader(name)
+    yield reader
+    reader.close()
+
+
+def publish(writer, n, buttons=0):
+    report = XusbReport()
+    report.buttons = 0x1000
+    report.set_left_stick(0.5, -0.5)
+    report.set_triggers(1.0, 0.0)
+    for i in range(n):
+        snapshot = InputSnapshot(float(i), array('d', [0.1 * i, 0.0, 0.0, 0.0]), buttons, ((1, -1),))
+        writer.publish(snapshot, array('d', [0.5, -0.25]), 1, report)
+
+
+def test_round_trip(writer, reader):
+    assert reader.read() is None
+    publish(writer, 3, buttons=1 << 4)
+    frame = reader.read()
+    assert frame.sequence == reader.sequence == 3
+    assert frame.timestamp == 2.0
+    assert frame.axes[0] == pytest.approx(0.2)
+    assert frame.pressed(4) and not frame.pressed(5)
+    assert frame.hats == ((1, -1),)
+    assert reader.value_dict(frame) == {'roll': 0.5, 'pitch': -0.25}
+    assert reader.combo_names(frame) == ['flares']
+    assert frame.report == (0x1000, 16384, -16384, 0, 0, 255, 0)
+
+
+def test_more_than_64_buttons(name):
+    writer = TelemetryWriter(4, 96, 1, name=name, slots=8)
+    reader = TelemetryReader(name)
+    try:
+        publish(writer, 1, buttons=(1 << 95) | (1 << 64) | 1)
+        frame = reader.read()
+        assert reader.num_buttons == 96
+        assert frame.pressed(95) and frame.pressed(64) and frame.pressed(0) and not frame.pressed(63)
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_overwritten_record_is_gone(writer, reader):
+    publish(writer, 10)
+    assert reader.read(2) is None
+    assert reader.read(3).sequence == 3
+
+
+def test_torn_record_is_rejected(writer, reader):
+    publish(writer, 2)
+    base = writer.data_offset + (2 % writer.slots) * writer.record_size
+    # writer mid-record: head already bumped, tail not yet
+    SEQ.pack_into(writer.buf, base, 10)
+    assert reader.read(2) is None
+    SEQ.pack_into(writer.buf, base, 2)
+    assert reader.read(2) is not None
+    SEQ.pack_into(writer.buf, base + writer.tail_offset, 1)
+    assert reader.read(2) is None
+
+
+def test_meta_follows_describe(writer, reader):
+    publish(writer, 1)
+    writer.describe(['yaw'], [], 1)
+    publish(writer, 1)
+    assert reader.names()['values'] == ['yaw']
+    assert reader.value_dict(reader.read()) == {'yaw': 0.5}
+
+
+def test_live_block_is_not_taken_over(writer, name):
+    with pytest.raises(RuntimeError, match=f"in use by pid {os.getpid()}"):
+        TelemetryWriter(4, 12, 1, name=name, slots=8)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="windows frees the block with its last handle")
+def test_stale_block_is_taken_over(name):
+    stale = TelemetryWriter(4, 12, 1, name=name, slots=8)
+    child = subprocess.Popen([sys.executable, '-c', 'pass'])
+    child.wait()
+    fields = list(HEADER.unpack_from(stale.buf, 0))
+    fields[-1] = child.pid
+    HEADER.pack_into(stale.buf, 0, *fields)
+    writer = TelemetryWriter(4, 12, 1, name=name, slots=8)
+    try:
+        reader = TelemetryReader(name)
+        assert reader.writer_pid == os.getpid()
+        reader.close()
+    finally:
+        # the stale writer's name now belongs to the new block, only drop the mapping
+        stale._slots = []
+        stale.buf = None
+        stale.shm.close()
+        writer.close()
+
+
+def test_controller_publishes_every_tick(config, make_controller, name):
+    controller, device, _ = make_controller(config, [sample(), sample(1 << 1)])
+    controller.enable_telemetry(TelemetryWriter(device.num_axes, device.num_buttons, device.num_hats, name=name))
+    reader = TelemetryReader(name)
+    try:
+        controller.tick()
+        controller.tick()
+        frame = reader.read()
+        assert frame.sequence == 2
+        assert frame.pressed(1)
+        assert frame.report[0] == controller.report.buttons
+    finally:
+        reader.close()
+        controller.cleanup()
+
+
+def test_scaled_axes_past_full_deflection_publish(config, make_controller, name):
+    config['axis_mapping']['roll']['scale'] = 1.5
+    controller, device, _ = make_controller(config, [sample(axes=(1.0, -1.0, 0, 0))])
+    controller.enable_telemetry(TelemetryWriter(device.num_axes, device.num_buttons, device.num_hats, name=name))
+    reader = TelemetryReader(name)
+    try:
+        controller.tick()
+        assert reader.read().report[1] == 32767
+    finally:
+        reader.close()
+        controller.cleanup()
@@ -0,0 +1,101 @@
+from bindings import XUSB_BUTTONS, compile_bindings
+from conftest import sample
+
+Y = XUSB_BUTTONS['XUSB_GAMEPAD_Y']
+BUTTON = 1 << 3
+
+
+def combo(mode, **settings):
+    spec = {'mode': mode, 'xusb': ['XUSB_GAMEPAD_Y']}
+    if mode != 'sequence':
+        spec['trigger'] = 3
+    spec.update(settings)
+    return compile_bindings({'combos': {'c': spec}})
+
+
+def test_long_press():
+    table = combo('long_press', hold_ms=400)
+    assert table.evaluate(BUTTON, 0.0) == 0
+    assert table.next_deadline == 0.4
+    assert table.evaluate(BUTTON, 0.39) == 0
+    assert table.evaluate(BUTTON, 0.41) == Y
+    # stays on while held, off on release
+    assert table.evaluate(BUTTON, 5.0) == Y
+    assert table.evaluate(0, 5.1) == 0
+
+
+def test_long_press_released_early():
+    table = combo('long_press', hold_ms=400)
+    table.evaluate(BUTTON, 0.0)
+    table.evaluate(0, 0.2)
+    # the pending timer is stale, it must not fire
+    assert table.evaluate(0, 0.5) == 0
+
+
+def test_tap_pulses():
+    table = combo('tap', tap_ms=200, pulse_ms=80)
+    table.evaluate(BUTTON, 0.0)
+    assert table.evaluate(0, 0.1) == Y
+    assert table.next_deadline == 0.1 + 0.08
+    assert table.evaluate(0, 0.17) == Y
+    assert table.evaluate(0, 0.19) == 0
+    assert table.next_deadline is None
+
+
+def test_slow_release_is_not_a_tap():
+    table = combo('tap', tap_ms=200)
+    table.evaluate(BUTTON, 0.0)
+    assert table.evaluate(0, 0.3) == 0
+
+
+def test_double_tap():
+    table = combo('double_tap', window_ms=300)
+    table.evaluate(BUTTON, 0.0)
+    table.evaluate(0, 0.05)
+    assert table.evaluate(BUTTON, 0.2) == Y
+    assert table.active_names() == ['c']
+
+
+def test_double_tap_too_slow():
+    table = combo('double_tap', window_ms=300)
+    table.evaluate(BUTTON, 0.0)
+    table.evaluate(0, 0.05)
+    assert table.evaluate(BUTTON, 0.5) == 0
+
+
+def test_sequence():
+    table = combo('sequence', sequence=[1, 2, 1], window_ms=300)
+    presses = [1 << 1, 0, 1 << 2, 0, 1 << 1]
+    results = [table.evaluate(buttons, i * 0.1) for i, buttons in enumerate(presses)]
+    assert results == [0, 0, 0, 0, Y]
+
+
+def test_sequence_wrong_button_restarts():
+    table = combo('sequence', sequence=[1, 2], window_ms=300)
+    for i, buttons in enumerate([1 << 1, 0, 1 << 3, 0, 1 << 2]):
+        assert table.evaluate(buttons, i * 0.1) == 0
+    # a fresh attempt still completes
+    table.evaluate(0, 0.5)
+    table.evaluate(1 << 1, 0.6)
+    table.evaluate(0, 0.7)
+    assert table.evaluate(1 << 2, 0.8) == Y
+
+
+def test_reset_treats_held_buttons_as_down():
+    table = combo('long_press', hold_ms=400)
+    table.evaluate(BUTTON, 0.0)
+    table.reset(BUTTON)
+    assert table.next_deadline is None
+    # no new press edge while it stays held, so no timer either
+    assert table.evaluate(BUTTON, 1.0) == 0
+    assert table.evaluate(0, 1.1) == 0
+    table.evaluate(BUTTON, 1.2)
+    assert table.evaluate(BUTTON, 1.7) == Y
+
+
+def test_controller_wait_timeout_follows_timer(config, make_controller):
+    config['bindings']['combos']['hold_y'] = {'mode': 'long_press', 'trigger': 7,
+                                             'xusb': ['XUSB_GAMEPAD_Y'], 'hold_ms': 400}
+    controller, _, _ = make_controller(config, [sample(1 << 7)])
+    controller.tick()
+    assert 0.0 < controller.wait_timeout(10.0) <= 0.4
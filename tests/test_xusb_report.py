@@ -0,0 +1,21 @@
+from backends import FakeGamepad
+from xusb_report import XusbReport
+
+
+def test_setters_clamp_to_driver_range():
+    report = XusbReport()
+    report.set_left_stick(1.5, -1.5)
+    report.set_right_stick(-2.0, 2.0)
+    report.set_triggers(1.2, -0.1)
+    assert report.state() == (0, 32767, -32768, -32768, 32767, 255, 0)
+
+
+def test_submit_only_on_change():
+    report = XusbReport()
+    pad = FakeGamepad()
+    assert report.submit(pad)
+    assert not report.submit(pad)
+    report.set_left_stick(0.00001, 0)  # rounds to the same driver value
+    assert not report.submit(pad)
+    report.set_left_stick(0.5, 0)
+    assert report.submit(pad) and pad.left_x == 16384
@@ -0,0 +1,119 @@
+import os
+import sys
+import threading
+import time
+
+# how long either thread may block before re-checking for shutdown
+WAIT_TIMEOUT = 0.25
+
+
+class LatestSnapshot:
+    """Single-slot handoff from the sampling thread to the output thread."""
+
+    def __init__(self):
+        self.slot = (0, None)
+        self.published = 0
+        self.taken = 0
+        self.closed = False
+        self.ready = threading.Event()
+        self._last = 0
+
+    def publish(self, snapshot):
+        # never waits, a slow reader just skips the snapshots it didn't get to
+        self.published += 1
+        self.slot = (self.published, snapshot)
+        self.ready.set()
+
+    def take(self, timeout: float):
+        """Newest unseen snapshot, or None on timeout / close."""
+        if not self.ready.wait(timeout):
+            return None
+        self.ready.clear()
+        sequence, snapshot = self.slot
+        if sequence == self._last:
+            # published between the wait and the clear, already handed out
+            return None
+        self._last = sequence
+        self.taken += 1
+        return snapshot
+
+    @property
+    def skipped(self) -> int:
+        return self.published - self.taken
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+
+def raise_thread_priority():
+    """Best effort, the sampler still works at normal priority."""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 2)  # THREAD_PRIORITY_HIGHEST
+        else:
+            # per-thread on Linux, usually needs CAP_SYS_NICE
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), -5)
+    except (AttributeError, OSError):
+        pass
+
+
+class OutputThread(threading.Thread):
+    """Maps and submits every snapshot the sampler publishes, off the sampling thread."""
+
+    def __init__(self, controller, handoff: LatestSnapshot):
+        super().__init__(name="pad-output", daemon=True)
+        self.controller = controller
+        self.handoff = handoff
+        self.error = None
+
+    def run(self):
+        controller = self.controller
+        handoff = self.handoff
+        try:
+            while controller.running and not handoff.closed:
+                snapshot = handoff.take(WAIT_TIMEOUT)
+                if snapshot is not None:
+                    controller.process_snapshot(snapshot)
+        except BaseException as e:
+            # re-raised on the main thread by run_threaded()
+            self.error = e
+            controller.stop()
+
+
+def run_threaded(controller, mode: str, rate: float, poll_interval: float = 0.01):
+    """Samples on the calling thread (where pygame was initialized) and hands snapshots to an OutputThread."""
+    manager = controller.manager
+    handoff = LatestSnapshot()
+    output = OutputThread(controller, handoff)
+    raise_thread_priority()
+    if mode == 'event':
+        manager.enable_input_events()
+    period = 1.0 / rate
+    deadline = time.perf_counter()
+    output.start()
+    try:
+        while controller.running:
+            handoff.publish(manager.capture())
+            if mode == 'event':
+                manager.wait_for_input(controller.wait_timeout(WAIT_TIMEOUT))
+            elif mode == 'fixed':
+                deadline += period
+                remaining = deadline - time.perf_counter()
+                if remaining > 0:
+                    time.sleep(remaining)
+                    continue
+                if controller.profiler is not None:
+                    controller.profiler.record_missed_deadline()
+                if remaining < -period:
+                    deadline = time.perf_counter()
+            else:
+                time.sleep(poll_interval)
+    finally:
+        handoff.close()
+        output.join()
+    if output.error is not None:
+        raise output.error
+    return handoff
@@ -0,0 +1,75 @@
+# sticks and triggers are kept in driver units, so float noise that rounds the same doesn't resend.
+# scaled axes can go past full deflection, the driver's short/byte would wrap around
+def _stick(value: float) -> int:
+    value = int(round(value * 32767))
+    return -32768 if value < -32768 else 32767 if value > 32767 else value
+
+
+def _trigger(value: float) -> int:
+    value = int(round(value * 255))
+    return 0 if value < 0 else 255 if value > 255 else value
+
+
+class XusbReport:
+    """Shadow copy of the virtual pad's XUSB report, sent in one update() and only when it changed."""
+
+    __slots__ = ('buttons', 'left_x', 'left_y', 'right_x', 'right_y',
+                 'left_trigger', 'right_trigger', '_sent', 'submits')
+
+    def __init__(self):
+        self.clear()
+        self._sent = None  # nothing sent yet, first submit always goes out
+        self.submits = 0
+
+    def clear(self):
+        self.buttons = 0
+        self.left_x = 0
+        self.left_y = 0
+        self.right_x = 0
+        self.right_y = 0
+        self.left_trigger = 0
+        self.right_trigger = 0
+
+    def set_left_stick(self, x: float, y: float):
+        self.left_x = _stick(x)
+        self.left_y = _stick(y)
+
+    def set_right_stick(self, x: float, y: float):
+        self.right_x = _stick(x)
+        self.right_y = _stick(y)
+
+    def set_triggers(self, left: float, right: float):
+        self.left_trigger = _trigger(left)
+        self.right_trigger = _trigger(right)
+
+    def state(self) -> tuple:
+        return (self.buttons, self.left_x, self.left_y, self.right_x, self.right_y,
+                self.left_trigger, self.right_trigger)
+
+    def submit(self, gamepad) -> bool:
+        """Sends the report if it changed. Returns True if the driver was called."""
+        state = self.state()
+        sent = self._sent
+        if state == sent:
+            return False
+
+        old_buttons = sent[0] if sent else 0
+        changed = self.buttons ^ old_buttons
+        if changed & self.buttons:
+            gamepad.press_button(changed & self.buttons)
+        if changed & old_buttons:
+            gamepad.release_button(changed & old_buttons)
+        gamepad.left_joystick(self.left_x, self.left_y)
+        gamepad.right_joystick(self.right_x, self.right_y)
+        gamepad.left_trigger(self.left_trigger)
+        gamepad.right_trigger(self.right_trigger)
+        gamepad.update()
+
+        self._sent = state
+        self.submits += 1
+        return True
+
+    def reset(self):
+        # matches gamepad.reset(), the next submit compares against a neutral pad
+        self.clear()
+        self._sent = self.state()